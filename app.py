@@ -1,17 +1,30 @@
 import streamlit as st
 import asyncio
+from services.llm_registry import llm_registry
 from services.response_generation import LLMResponseGenerator
+from services.utils.background_loop import background_loop
+from services.utils.conversation_history import ConversationHistory
+from services.utils.executors import run_blocking
+from services.utils.history_compactor import COMPACTION_ENABLED, history_compactor
 from langchain_core.messages import AIMessage, HumanMessage
 from services.prompts.agent import create_chat_prompt
+from services.prompts.text.config_store import bind_session
 from services.prompts.text.prompt_manager import get_all_prompts, get_current_prompt, set_current_prompt
 from services.prompts.text.model_manager import get_available_models, get_current_model, set_current_model
+from services.streamlit.trace_panel import debug_enabled, render_trace_panel
+from services.utils.text_splitter import token_counter
 
 
 def initialize_chat_state():
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = ConversationHistory(get_current_model())
     if "llm_generator" not in st.session_state:
-        st.session_state.llm_generator = LLMResponseGenerator(model_name=get_current_model())
+        model_name = get_current_model()
+        # Create the shared client ahead of the first message (no-op once warmed)
+        llm_registry.warm_up([model_name])
+        # Load the tokenizer off the script thread so the first message does not pay for it
+        background_loop.submit(run_blocking(token_counter.preload, [model_name]))
+        st.session_state.llm_generator = LLMResponseGenerator(model_name=model_name)
 
 
 def display_chat_messages():
@@ -22,8 +35,38 @@ def display_chat_messages():
             st.chat_message("assistant").markdown(message.content)
 
 
+async def render_response_stream(events) -> str:
+    """Render streamed agent events as they arrive and return the final answer."""
+    status = st.status("Thinking...")
+    answer = st.empty()
+    text = ""
+    async for event in events:
+        if event["type"] == "token":
+            text += event["text"]
+            answer.markdown(text + "▌")
+        elif event["type"] == "tool_start":
+            # Anything streamed before a tool call was planning, not the answer
+            text = ""
+            answer.empty()
+            status.update(label=f"Running {event['name']}...")
+            status.write(f"🔧 `{event['name']}`")
+        elif event["type"] == "tool_end":
+            status.update(label="Thinking...")
+        elif event["type"] == "end":
+            text = event["output"]
+            # Time-to-first-token and total latency for this turn
+            st.session_state.setdefault("turn_metrics", []).append(event["metrics"])
+            st.session_state.last_trace_id = event["metrics"]["trace_id"]
+            status.update(label=f"Done in {event['metrics']['total']:.1f}s", state="complete")
+    answer.markdown(text)
+    return text
+
+
 async def main():
     try:
+        # Model and prompt selections are per session; config.json only supplies defaults
+        bind_session(st.session_state.setdefault("config_selection", {}))
+
         # Custom CSS for header alignment
         st.markdown("""
             <style>
@@ -88,8 +131,6 @@ async def main():
                     )
                     if selected_prompt != current_prompt:
                         set_current_prompt(selected_prompt)
-                        # Create new prompt with updated selection
-                        st.session_state.prompt = create_chat_prompt()
                         st.rerun()
             except Exception as e:
                 st.error(f"Error loading prompts: {str(e)}")
@@ -101,40 +142,44 @@ async def main():
         display_chat_messages()
 
         if prompt := st.chat_input("What would you like me to help you with?"):
-            st.session_state.messages.append(HumanMessage(content=prompt))
+            history = st.session_state.messages
             st.chat_message("user").markdown(prompt)
 
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    try:
-                        # Use the current prompt template
-                        if "prompt" not in st.session_state:
-                            st.session_state.prompt = create_chat_prompt()
-                        
-                        response = await st.session_state.llm_generator.generate_response(
+                try:
+                    # History holds the previous messages only; token counts are cached per message
+                    response = await render_response_stream(
+                        st.session_state.llm_generator.stream_response(
                             prompt,
-                            st.session_state.prompt,
-                            st.session_state.messages[:-1]  # Pass previous messages excluding the current one
+                            # Compiled once per prompt file version; picks up saves from the editor
+                            create_chat_prompt(),
+                            history
+                        )
+                    )
+                    history.extend([HumanMessage(content=prompt), AIMessage(content=response)])
+                    if COMPACTION_ENABLED:
+                        # Fold older turns into the running summary before the next turn
+                        history_compactor.schedule(history)
+                    if debug_enabled():
+                        render_trace_panel(st.session_state.get("last_trace_id"))
+                except Exception as e:
+                    history.append(HumanMessage(content=prompt))
+                    error_message = str(e)
+                    if "context_length" in error_message.lower():
+                        st.markdown(
+                            "<div class='error-message'>"
+                            "The conversation has become too long for the model to process. "
+                            "Please try starting a new conversation or reducing your message length."
+                            "</div>",
+                            unsafe_allow_html=True
+                        )
+                    else:
+                        st.markdown(
+                            f"<div class='error-message'>"
+                            f"An error occurred while generating the response: {error_message}"
+                            f"</div>",
+                            unsafe_allow_html=True
                         )
-                        st.session_state.messages.append(AIMessage(content=response))
-                        st.markdown(response)
-                    except Exception as e:
-                        error_message = str(e)
-                        if "context_length" in error_message.lower():
-                            st.markdown(
-                                "<div class='error-message'>"
-                                "The conversation has become too long for the model to process. "
-                                "Please try starting a new conversation or reducing your message length."
-                                "</div>",
-                                unsafe_allow_html=True
-                            )
-                        else:
-                            st.markdown(
-                                f"<div class='error-message'>"
-                                f"An error occurred while generating the response: {error_message}"
-                                f"</div>",
-                                unsafe_allow_html=True
-                            )
     except Exception as e:
         st.error(f"An unexpected error occurred: {str(e)}")
 
@@ -0,0 +1,97 @@
+"""Offline stand-ins for the chat models and tools used by the benchmark suite."""
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+
+class FakeAgentModel(BaseChatModel):
+    """Tool-calling chat model that calls `tool_name` once, then answers.
+
+    `latency` seconds are slept per call to stand in for the provider round trip.
+    """
+    tool_name: str = "stub_search"
+    answer: str = "Here is a draft post built from the research results above."
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-agent"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "FakeAgentModel":
+        return self
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        if any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(content=self.answer)
+        return AIMessage(content="", tool_calls=[
+            {"name": self.tool_name, "args": {"query": "benchmark"}, "id": "call_1"}
+        ])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._generate(messages, stop)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any):
+        result = await self._agenerate(messages, stop)
+        message = result.generations[0].message
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": self.tool_name, "args": '{"query": "benchmark"}', "id": "call_1", "index": 0}
+            ]))
+            return
+        for word in message.content.split(" "):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(word + " ", chunk=chunk)
+            yield chunk
+
+
+class FakeSummarizer(BaseChatModel):
+    """Chat model that "summarizes" by keeping the first `keep_chars` characters of the prompt."""
+    keep_chars: int = 4000
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-summarizer"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = messages[-1].content[-self.keep_chars:]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._generate(messages, stop)
+
+
+class StubSearchArgs(BaseModel):
+    query: str = Field(..., description="Search query")
+
+
+class StubSearchTool(BaseTool):
+    """Search tool returning a fixed text, as a research tool would."""
+    name: str = "stub_search"
+    description: str = "Search stub used by benchmarks"
+    args_schema: type[BaseModel] = StubSearchArgs
+    result: str = ""
+
+    def _run(self, query: str) -> str:
+        return self.result
+
+    async def _arun(self, query: str) -> str:
+        return self.result
@@ -0,0 +1,123 @@
+"""Import-time budget for app startup.
+
+Imports the app in fresh interpreters with `python -X importtime`, reports the median
+import time and the slowest direct imports, and fails when the median exceeds the
+budget or when a module that should load on first use (provider SDKs, tool
+dependencies, tokenizers) is imported at startup.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--budget-ms 1500] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET = "app"
+# Median import time of TARGET allowed, in milliseconds. Measured here over 15 runs: about 1.3s
+# with the lazy tool registry (3.8s before it), and about 1.1s (0.9s minimum) once llm_registry
+# also deferred its model and HTTP imports. Most of what remains is streamlit and langchain_core's
+# prompt stack, which pulls in langsmith.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+# Modules that are only needed once a turn runs a model or a tool
+DEFERRED_MODULES = (
+    "langchain.agents",
+    "langchain_openai",
+    "langchain_anthropic",
+    "langchain_community",
+    "openai",
+    "anthropic",
+    "playwright",
+    "duckduckgo_search",
+    "youtube_search",
+    "youtube_transcript_api",
+    "wikipedia",
+    "trafilatura",
+    "tiktoken",
+    "numpy",
+)
+
+_PROBE = (
+    "import json, sys\n"
+    f"import {TARGET}\n"
+    f"print(json.dumps(sorted(m for m in {list(DEFERRED_MODULES)!r} if m in sys.modules)))\n"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, depth, cumulative microseconds) rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(cumulative)))
+    return rows
+
+
+def measure_once() -> Dict[str, Any]:
+    """Import TARGET in a fresh interpreter and return its timings and deferred modules loaded."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = parse_importtime(completed.stderr)
+    total = next(cumulative for name, depth, cumulative in reversed(rows) if name == TARGET and depth == 0)
+    direct = sorted(((name, cumulative) for name, depth, cumulative in rows if depth == 1),
+                    key=lambda row: row[1], reverse=True)
+    return {
+        "total_ms": total / 1000,
+        "direct_ms": {name: cumulative / 1000 for name, cumulative in direct},
+        "deferred_loaded": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def run(runs: int = 5) -> Dict[str, Any]:
+    samples = [measure_once() for _ in range(runs)]
+    # Slowest direct imports of the median run
+    median_run = sorted(samples, key=lambda sample: sample["total_ms"])[len(samples) // 2]
+    return {
+        "target": TARGET,
+        "runs": runs,
+        "median_ms": statistics.median(sample["total_ms"] for sample in samples),
+        "min_ms": min(sample["total_ms"] for sample in samples),
+        "slowest_imports_ms": dict(list(median_run["direct_ms"].items())[:10]),
+        "deferred_loaded": sorted({module for sample in samples for module in sample["deferred_loaded"]}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    results["budget_ms"] = args.budget_ms
+    print(f"import {TARGET}: median {results['median_ms']:.0f} ms, min {results['min_ms']:.0f} ms "
+          f"over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    for name, ms in results["slowest_imports_ms"].items():
+        print(f"  {name:<40} {ms:8.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    if results["deferred_loaded"]:
+        print(f"FAIL: imported at startup but should load on first use: {', '.join(results['deferred_loaded'])}")
+        failed = True
+    if results["median_ms"] > args.budget_ms:
+        print(f"FAIL: import time {results['median_ms']:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
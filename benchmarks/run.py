@@ -0,0 +1,307 @@
+"""Offline micro-benchmarks for the response generation hot paths.
+
+Every benchmark runs without network access: chat models and tools are replaced by
+the fakes in benchmarks/fakes.py and inputs come from benchmarks/fixtures. Results are
+written as JSON and can be compared against a stored baseline; a benchmark whose
+median time grows by more than its threshold is reported as a regression and the
+command exits with status 1.
+
+Usage:
+    python -m benchmarks.run [--repeat 20] [--only NAME ...] [--json results.json]
+                             [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Baselines are only comparable on the same machine and tokenizer setup (see
+"tokenizer" in the results), so record one on the machine that runs the comparison.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from benchmarks.fakes import FakeAgentModel, FakeSummarizer, StubSearchTool
+from services.llm_registry import llm_registry
+from services.prompts import agent_prompt
+from services.response_generation import LLMResponseGenerator
+from services.utils.summarizer import summarize_long_text
+from services.utils.text_splitter import (count_tokens, count_tokens_batch, ensure_context_length,
+                                          split_text_by_tokens, token_counter)
+from services.youtube.compact_transcript import CompactTranscript
+from services.youtube.loader import _format_transcript
+from services.youtube.url_parser import get_video_id
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Allowed growth of the median time before a benchmark counts as a regression
+DEFAULT_THRESHOLD = 0.25
+THRESHOLDS = {
+    # Dominated by the simulated model latency and event loop scheduling
+    "summarize_long_text_fanout": 0.5,
+    "generate_response_turn": 0.5,
+}
+FAKE_MODEL_NAME = "bench-fake"
+FAKE_LATENCY = 0.01
+
+# name -> factory that prepares inputs once and returns the (sync or async) callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    def register(factory: Callable[[], Callable[[], Any]]) -> Callable[[], Callable[[], Any]]:
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+
+def load_transcript() -> List[Dict]:
+    with open(os.path.join(FIXTURES_DIR, "transcript.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def transcript_text(copies: int = 1) -> str:
+    text = _format_transcript(load_transcript())
+    return " ".join([text] * copies)
+
+
+@benchmark("count_tokens_cold")
+def bench_count_tokens_cold():
+    text = transcript_text()
+
+    def run():
+        token_counter.clear()
+        count_tokens(text, "gpt-4o")
+    return run
+
+
+@benchmark("count_tokens_memoized")
+def bench_count_tokens_memoized():
+    text = transcript_text()
+    count_tokens(text, "gpt-4o")
+    return lambda: count_tokens(text, "gpt-4o")
+
+
+@benchmark("count_tokens_batch_cold")
+def bench_count_tokens_batch_cold():
+    texts = [block["text"] for block in load_transcript()]
+
+    def run():
+        token_counter.clear()
+        count_tokens_batch(texts, "gpt-4o")
+    return run
+
+
+@benchmark("split_text_by_tokens")
+def bench_split_text_by_tokens():
+    # Several chunks for gpt-4o (context window minus max output tokens per chunk)
+    text = transcript_text(copies=12)
+    return lambda: split_text_by_tokens(text, "gpt-4o")
+
+
+@benchmark("ensure_context_length")
+def bench_ensure_context_length():
+    blocks = load_transcript()
+    content = " ".join(block["text"] for block in blocks[:100])
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}: {content}"} for i in range(200)]
+    return lambda: ensure_context_length(messages, "gpt-4o")
+
+
+@benchmark("summarize_long_text_fanout")
+def bench_summarize_long_text():
+    # Longer than the summarizer's context window, so it goes through map and reduce
+    text = transcript_text(copies=40)
+    summarizer = FakeSummarizer(latency=FAKE_LATENCY)
+
+    async def run():
+        await summarize_long_text(text, target_model="gpt-4o", summarizer_model="gpt-4o-mini",
+                                  max_concurrency=4, cache=None, summarizer=summarizer)
+    return run
+
+
+@benchmark("format_transcript")
+def bench_format_transcript():
+    # The loader formats transcripts as they come out of the cache
+    transcript = CompactTranscript.from_blocks(load_transcript())
+    return lambda: _format_transcript(transcript)
+
+
+@benchmark("format_transcript_timestamps")
+def bench_format_transcript_timestamps():
+    transcript = CompactTranscript.from_blocks(load_transcript())
+    return lambda: _format_transcript(transcript, include_timestamps=True)
+
+
+@benchmark("compact_transcript_from_blocks")
+def bench_compact_transcript_from_blocks():
+    blocks = load_transcript()
+    return lambda: CompactTranscript.from_blocks(blocks)
+
+
+@benchmark("get_video_id")
+def bench_get_video_id():
+    ids = [f"vid{i:08d}"[:11] for i in range(250)]
+    urls = []
+    for video_id in ids:
+        urls += [
+            f"https://www.youtube.com/watch?v={video_id}&t=42s",
+            f"https://youtu.be/{video_id}",
+            f"https://www.youtube.com/embed/{video_id}",
+            f"https://www.youtube.com/shorts/{video_id}",
+        ]
+
+    def run():
+        for url in urls:
+            get_video_id(url)
+    return run
+
+
+@benchmark("generate_response_turn")
+def bench_generate_response():
+    llm_registry.register_chat_model(FAKE_MODEL_NAME, FakeAgentModel(latency=FAKE_LATENCY))
+    tool = StubSearchTool(result=transcript_text())
+    generator = LLMResponseGenerator(model_name=FAKE_MODEL_NAME, tools=[tool])
+    history = [HumanMessage(content=f"Question {i}") if i % 2 == 0 else AIMessage(content=f"Answer {i}")
+               for i in range(20)]
+
+    async def run():
+        await generator.generate_response("Write a post about small AI teams", agent_prompt, history)
+    return run
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 2) -> Dict[str, float]:
+    """Time `repeat` calls of fn (after `warmup` untimed calls) and summarize in milliseconds."""
+    is_async = asyncio.iscoroutinefunction(fn)
+
+    async def timings_async() -> List[float]:
+        timings = []
+        for i in range(warmup + repeat):
+            started = time.perf_counter()
+            await fn()
+            if i >= warmup:
+                timings.append(time.perf_counter() - started)
+        return timings
+
+    def timings_sync() -> List[float]:
+        timings = []
+        for i in range(warmup + repeat):
+            started = time.perf_counter()
+            fn()
+            if i >= warmup:
+                timings.append(time.perf_counter() - started)
+        return timings
+
+    # The agent executor prints its steps; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        timings = asyncio.run(timings_async()) if is_async else timings_sync()
+    timings_ms = sorted(1000 * t for t in timings)
+    return {
+        "median_ms": statistics.median(timings_ms),
+        "min_ms": timings_ms[0],
+        "p95_ms": timings_ms[min(len(timings_ms) - 1, int(0.95 * len(timings_ms)))],
+        "repeat": repeat,
+    }
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 20) -> Dict[str, Any]:
+    """Run the selected benchmarks (all by default) and return the results document."""
+    results = {}
+    for name, factory in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        try:
+            results[name] = measure(factory(), repeat)
+        except Exception as e:
+            # Keep going; a broken benchmark must not hide the others
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+    return {"meta": environment(), "results": results}
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        # Offline without a tiktoken cache, counts use the characters-per-token estimate
+        "tokenizer": "tiktoken" if token_counter.get_encoding("gpt-4o") is not None else "estimate",
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Compare median times against a baseline results document.
+
+    Returns:
+        One row per benchmark present in both, with the ratio to the baseline and
+        whether it exceeds its regression threshold
+    """
+    rows = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or "error" in previous:
+            continue
+        if "error" in current:
+            rows.append({"name": name, "ratio": float("inf"), "threshold": THRESHOLDS.get(name, DEFAULT_THRESHOLD),
+                         "regression": True})
+            continue
+        ratio = current["median_ms"] / previous["median_ms"] if previous["median_ms"] else 1.0
+        threshold = THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+        rows.append({"name": name, "ratio": ratio, "threshold": threshold, "regression": ratio > 1 + threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.only, args.repeat)
+    for name, row in results["results"].items():
+        if "error" in row:
+            print(f"{name:<30} failed: {row['error']}")
+            continue
+        print(f"{name:<30} median {row['median_ms']:9.3f} ms  min {row['min_ms']:9.3f} ms  "
+              f"p95 {row['p95_ms']:9.3f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("tokenizer") != results["meta"]["tokenizer"]:
+        print("Warning: baseline was recorded with a different tokenizer setup")
+    rows = compare(results, baseline)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{row['name']:<30} {row['ratio']:6.2f}x baseline (limit {1 + row['threshold']:.2f}x)  {flag}")
+    if any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
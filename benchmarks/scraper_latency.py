@@ -0,0 +1,142 @@
+"""Per-page latency of AsyncWebScraper on saved HTML fixtures.
+
+The fixtures in benchmarks/fixtures/html are served by a local HTTP server that
+simulates network cost: every file under /assets/ answers after ASSET_DELAY seconds
+and /beacon long-polls like an analytics endpoint. Each fixture is scraped in the
+legacy mode (all resources loaded, wait for network idle), with resource blocking,
+and through the default HTTP-first path (plain fetch and extraction, escalating to the
+browser only for short pages).
+
+Usage:
+    python -m benchmarks.scraper_latency [--runs 5] [--json results.json]
+
+The browser modes require a Chromium installed with `playwright install chromium`;
+without one they are reported as skipped. No internet access is needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Awaitable, Callable, Dict, List
+
+from services.agent_tools.browser_pool import browser_pool
+from services.agent_tools.webscraper import AsyncWebScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+FIXTURES = ["article.html", "listing.html"]
+ASSET_DELAY = 0.3
+BEACON_DELAY = 2.0
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def do_GET(self):
+        if self.path.startswith("/beacon"):
+            time.sleep(BEACON_DELAY)
+            self.send_response(204)
+            self.end_headers()
+        elif self.path.startswith("/assets/"):
+            time.sleep(ASSET_DELAY)
+            body = b"/* fixture asset */"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    """Serve the HTML fixtures on a free localhost port in a daemon thread."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(scrape: Callable[[], Awaitable[str]], runs: int) -> Dict[str, float]:
+    # One untimed run so the browser launch or process pool start is not attributed to a mode
+    content = await scrape()
+    if content.startswith("Error:"):
+        raise RuntimeError(content)
+    timings: List[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        content = await scrape()
+        timings.append(time.perf_counter() - started)
+    return {
+        "median_ms": 1000 * statistics.median(timings),
+        "min_ms": 1000 * min(timings),
+        "max_ms": 1000 * max(timings),
+        "chars": len(content),
+    }
+
+
+def _modes(url: str) -> Dict[str, Callable[[], Awaitable[str]]]:
+    legacy = AsyncWebScraper(block_resources=False)
+    blocking = AsyncWebScraper(block_resources=True)
+    http_first = AsyncWebScraper()
+
+    async def scrape_http_first() -> str:
+        content, _, _ = await http_first._scrape_url(url)
+        return content
+
+    return {
+        "legacy": lambda: legacy._scrape_with_playwright(url),
+        "blocking": lambda: blocking._scrape_with_playwright(url),
+        "http_first": scrape_http_first,
+    }
+
+
+async def run(runs: int = 5) -> List[Dict]:
+    """Scrape every fixture in each mode and return one result row per (fixture, mode).
+
+    A mode that cannot run (e.g. no Chromium installed) gets a row with an "error" key.
+    """
+    server = start_fixture_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    try:
+        for fixture in FIXTURES:
+            for mode, scrape in _modes(f"{base_url}/{fixture}").items():
+                try:
+                    stats = await measure(scrape, runs)
+                except Exception as e:
+                    results.append({"fixture": fixture, "mode": mode, "error": str(e).splitlines()[0]})
+                    continue
+                results.append({"fixture": fixture, "mode": mode, **stats})
+    finally:
+        server.shutdown()
+        await browser_pool.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.runs))
+    for row in results:
+        if "error" in row:
+            print(f"{row['fixture']:<14} {row['mode']:<10} skipped: {row['error']}")
+            continue
+        print(f"{row['fixture']:<14} {row['mode']:<10} median {row['median_ms']:8.1f} ms  "
+              f"min {row['min_ms']:8.1f} ms  max {row['max_ms']:8.1f} ms  {row['chars']} chars")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
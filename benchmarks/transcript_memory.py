@@ -0,0 +1,120 @@
+"""Memory per hour of video and formatting throughput of transcript representations.
+
+Compares the caption dicts returned by YouTubeTranscriptApi with CompactTranscript on
+one hour of captions built from benchmarks/fixtures/transcript.json: in-memory size
+(measured with tracemalloc), size in the transcript disk cache (zlib-compressed, as
+stored) and formatting throughput with and without timestamps, in blocks per second.
+
+Usage:
+    python -m benchmarks.transcript_memory [--runs 20] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import tracemalloc
+import zlib
+from typing import Any, Callable, Dict, List
+
+from services.youtube.compact_transcript import CompactTranscript
+from services.youtube.time_format import format_seconds_to_timestamp
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "transcript.json")
+HOUR_SECONDS = 3600
+
+
+def hour_of_captions() -> List[Dict]:
+    """Repeat the fixture's captions (with shifted times) until they cover one hour."""
+    with open(FIXTURE, encoding="utf-8") as f:
+        fixture = json.load(f)
+    span = fixture[-1]["start"] + fixture[-1]["duration"]
+    blocks, offset = [], 0.0
+    while True:
+        for block in fixture:
+            start = round(block["start"] + offset, 2)
+            if start >= HOUR_SECONDS:
+                return blocks
+            # Copy the text so every caption owns its string, as after JSON decoding
+            blocks.append({"text": "".join(list(block["text"])), "start": start, "duration": block["duration"]})
+        offset += span
+
+
+def allocated_bytes(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by the object that `build` returns."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def format_dicts(blocks: List[Dict], include_timestamps: bool) -> str:
+    # The per-block formatting the loader used before CompactTranscript
+    if include_timestamps:
+        return "\n".join(
+            f"{format_seconds_to_timestamp(b['start'])} - {format_seconds_to_timestamp(b['start'] + b['duration'])}: "
+            f"{b['text']}"
+            for b in blocks
+        )
+    return " ".join(b['text'] for b in blocks)
+
+
+def blocks_per_second(fn: Callable[[], Any], blocks: int, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return blocks / statistics.median(timings)
+
+
+def run(runs: int = 20) -> Dict[str, Any]:
+    blocks = hour_of_captions()
+    serialized_json = json.dumps(blocks).encode("utf-8")
+    compact = CompactTranscript.from_blocks(blocks)
+
+    return {
+        "blocks_per_hour": len(blocks),
+        "dicts": {
+            "memory_bytes_per_hour": allocated_bytes(lambda: json.loads(serialized_json)),
+            "cache_bytes_per_hour": len(zlib.compress(serialized_json)),
+            "format_blocks_per_second": blocks_per_second(lambda: format_dicts(blocks, False), len(blocks), runs),
+            "format_timestamps_blocks_per_second": blocks_per_second(
+                lambda: format_dicts(blocks, True), len(blocks), runs),
+        },
+        "compact": {
+            "memory_bytes_per_hour": allocated_bytes(lambda: CompactTranscript.from_bytes(compact.to_bytes())),
+            "cache_bytes_per_hour": len(zlib.compress(compact.to_bytes())),
+            "format_blocks_per_second": blocks_per_second(lambda: compact.format(False), len(blocks), runs),
+            "format_timestamps_blocks_per_second": blocks_per_second(
+                lambda: compact.format(True), len(blocks), runs),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(f"{results['blocks_per_hour']} caption blocks per hour of video")
+    for name in ("dicts", "compact"):
+        row = results[name]
+        print(f"{name:<8} memory {row['memory_bytes_per_hour'] / 1024:8.0f} KiB/h  "
+              f"cache {row['cache_bytes_per_hour'] / 1024:6.0f} KiB/h  "
+              f"plain {row['format_blocks_per_second']:12,.0f} blocks/s  "
+              f"timestamps {row['format_timestamps_blocks_per_second']:10,.0f} blocks/s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
 from services.prompts.text import prompt_manager
+from services.prompts.text.config_store import bind_session
 
 
 def load_prompt():
@@ -23,6 +24,9 @@ st.set_page_config(
     menu_items={}
 )
 
+# Share the model/prompt selection of this user's session with the chat page
+bind_session(st.session_state.setdefault("config_selection", {}))
+
 # Header with back button
 col1, col2 = st.columns([0.1, 0.9])
 with col1:
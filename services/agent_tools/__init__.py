@@ -1,12 +1,56 @@
-from .webscraper import webscraper_tool
-from .youtube_search import youtube_search_tool
-from .youtube_transcript_loader import youtube_transcript_loader_tool
-from .duckduckgo_search import duckduckgo_search_tool
-from .wikipedia import wikipedia_tool
+import importlib
+import threading
+from typing import Dict, List, Tuple
 
+from langchain_core.tools import BaseTool
+
+# Tool name -> (module, attribute) of its instance. Modules are imported, and tools
+# constructed, on first use: together they pull in playwright, duckduckgo_search,
+# youtube_search, wikipedia and the YouTube transcript stack.
+TOOL_REGISTRY: Dict[str, Tuple[str, str]] = {
+    "web_scraper": ("services.agent_tools.webscraper", "webscraper_tool"),
+    "youtube_search": ("services.agent_tools.youtube_search", "youtube_search_tool"),
+    "youtube_transcript_loader_tool": ("services.agent_tools.youtube_transcript_loader",
+                                       "youtube_transcript_loader_tool"),
+    "duckduckgo_search": ("services.agent_tools.duckduckgo_search", "duckduckgo_search_tool"),
+    "wikipedia": ("services.agent_tools.wikipedia", "wikipedia_tool"),
+    "passage_search": ("services.agent_tools.passage_search", "passage_search_tool"),
+}
+# Module attribute name -> tool name, for `from services.agent_tools import webscraper_tool`
+_ATTRIBUTES = {attribute: name for name, (_, attribute) in TOOL_REGISTRY.items()}
+
+_tools: Dict[str, BaseTool] = {}
+_lock = threading.Lock()
+
+
+def get_tool(name: str) -> BaseTool:
+    """Return the tool registered as `name`, importing its module on first use.
+
+    Raises:
+        KeyError: If no tool is registered under `name`
+    """
+    tool = _tools.get(name)
+    if tool is None:
+        module_name, attribute = TOOL_REGISTRY[name]
+        with _lock:
+            tool = _tools.get(name)
+            if tool is None:
+                tool = _tools[name] = getattr(importlib.import_module(module_name), attribute)
+    return tool
+
+
+def get_toolkit() -> List[BaseTool]:
+    """Return every registered tool, in registry order."""
+    return [get_tool(name) for name in TOOL_REGISTRY]
+
+
+def __getattr__(name: str):
+    if name == "toolkit":
+        return get_toolkit()
+    if name in _ATTRIBUTES:
+        return get_tool(_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-toolkit = [webscraper_tool, youtube_search_tool, youtube_transcript_loader_tool, duckduckgo_search_tool,
-           wikipedia_tool]
 
 __all__ = [
     "webscraper_tool",
@@ -14,5 +58,9 @@ __all__ = [
     "youtube_transcript_loader_tool",
     "duckduckgo_search_tool",
     "wikipedia_tool",
+    "passage_search_tool",
     "toolkit",
+    "TOOL_REGISTRY",
+    "get_tool",
+    "get_toolkit",
 ]
@@ -0,0 +1,232 @@
+import asyncio
+import atexit
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+
+from services.utils.background_loop import background_loop, BackgroundLoop
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAUNCH_ARGS = ['--disable-web-security', '--disable-features=IsolateOrigins,site-per-process']
+DEFAULT_CONTEXT_OPTIONS = {
+    'viewport': {'width': 1920, 'height': 1080},
+    'user_agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
+class BrowserPool:
+    """A long-lived headless Chromium that hands out isolated browser contexts.
+
+    A single browser is launched lazily on the background loop and kept alive for
+    the lifetime of the process. Each page runs alone in its context; idle contexts are
+    reused (a pool hit) until they have served `max_context_uses` pages, after which
+    they are recycled. Before a context is reused, everything the page stored is
+    cleared: cookies, the localStorage, IndexedDB, service workers and Cache Storage of
+    every origin its frames visited, and the HTTP cache (sessionStorage belongs to the
+    closed page). A context that cannot be cleared is closed instead. At most
+    `max_pages` pages are open at the same time.
+    """
+
+    def __init__(self, max_pages: int = 4, max_context_uses: int = 20,
+                 launch_args: Optional[List[str]] = None,
+                 context_options: Optional[Dict[str, Any]] = None,
+                 loop: BackgroundLoop = background_loop):
+        self.max_pages = max_pages
+        self.max_context_uses = max_context_uses
+        self.launch_args = launch_args if launch_args is not None else DEFAULT_LAUNCH_ARGS
+        self.context_options = context_options if context_options is not None else DEFAULT_CONTEXT_OPTIONS
+        self._loop = loop
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[BrowserContext] = []
+        self._uses: Dict[int, int] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "recycled": 0,
+            "launches": 0,
+            "pages": 0,
+            "in_use": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    async def run(self, fn: Callable[[Page], Awaitable[Any]]) -> Any:
+        """Run `fn(page)` with a pooled page, from any event loop.
+
+        Args:
+            fn: Coroutine function receiving a fresh page in an isolated context
+
+        Returns:
+            Whatever `fn` returns
+        """
+        return await self._loop.run(self._run(fn))
+
+    async def _run(self, fn: Callable[[Page], Awaitable[Any]]) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pages)
+
+        started = time.perf_counter()
+        async with self._semaphore:
+            waited = time.perf_counter() - started
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            self._stats["pages"] += 1
+
+            context: Optional[BrowserContext] = None
+            page: Optional[Page] = None
+            # Origins the page's frames navigated to, whose storage is cleared afterwards
+            origins: Set[str] = set()
+            self._stats["in_use"] += 1
+            try:
+                context = await self._acquire_context()
+                page = await context.new_page()
+                page.on("framenavigated", lambda frame: origins.add(_origin(frame.url)))
+                return await fn(page)
+            finally:
+                self._stats["in_use"] -= 1
+                reusable = page is not None and await self._clear_storage(context, page, origins)
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                if context is not None:
+                    if not reusable:
+                        # A context that could not open a page, or whose storage could not be
+                        # cleared, is not returned to the pool
+                        await self._discard_context(context)
+                    else:
+                        await self._release_context(context)
+
+    async def _ensure_browser(self) -> Browser:
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                # A crashed browser invalidates every context it owned
+                self._idle.clear()
+                self._uses.clear()
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True, args=self.launch_args)
+                self._stats["launches"] += 1
+            return self._browser
+
+    async def _acquire_context(self) -> BrowserContext:
+        browser = await self._ensure_browser()
+        if self._idle:
+            self._stats["hits"] += 1
+            return self._idle.pop()
+        self._stats["misses"] += 1
+        context = await browser.new_context(**self.context_options)
+        self._uses[id(context)] = 0
+        return context
+
+    async def _clear_storage(self, context: BrowserContext, page: Page, origins: Set[str]) -> bool:
+        """Clear the storage of the origins a page visited, and the HTTP cache, over CDP.
+
+        Returns:
+            Whether the context is clean and may be reused
+        """
+        try:
+            session = await context.new_cdp_session(page)
+            for origin in origins - {""}:
+                await session.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            await session.send("Network.clearBrowserCache")
+            await session.detach()
+        except Exception as e:
+            logger.info(f"Could not clear browser context storage, closing it: {str(e)}")
+            return False
+        return True
+
+    async def _release_context(self, context: BrowserContext) -> None:
+        uses = self._uses.get(id(context), 0) + 1
+        if uses >= self.max_context_uses or self._browser is None or not self._browser.is_connected():
+            await self._discard_context(context)
+            return
+
+        self._uses[id(context)] = uses
+        try:
+            # Also drop third-party cookies, set by origins the page's frames never navigated to
+            await context.clear_cookies()
+        except Exception:
+            self._uses.pop(id(context), None)
+            return
+        self._idle.append(context)
+
+    async def _discard_context(self, context: BrowserContext) -> None:
+        self._uses.pop(id(context), None)
+        self._stats["recycled"] += 1
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters for sizing: hits, misses and page wait times."""
+        pages = self._stats["pages"]
+        acquired = self._stats["hits"] + self._stats["misses"]
+        return {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": self._stats["hits"] / acquired if acquired else 0.0,
+            "recycled": self._stats["recycled"],
+            "launches": self._stats["launches"],
+            "pages": pages,
+            "in_use": self._stats["in_use"],
+            "idle_contexts": len(self._idle),
+            "avg_wait_ms": 1000 * self._stats["wait_time_total"] / pages if pages else 0.0,
+            "max_wait_ms": 1000 * self._stats["wait_time_max"],
+        }
+
+    async def _shutdown(self) -> None:
+        contexts, self._idle = self._idle, []
+        self._uses.clear()
+        for context in contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def aclose(self) -> None:
+        """Close all contexts, the browser and the Playwright driver."""
+        await self._loop.run(self._shutdown())
+
+    def close(self) -> None:
+        """Synchronous shutdown, safe to call at interpreter exit."""
+        if self._browser is None and self._playwright is None:
+            return
+        try:
+            self._loop.submit(self._shutdown()).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"Browser pool shutdown failed: {str(e)}")
+
+
+def _origin(url: str) -> str:
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return ""
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
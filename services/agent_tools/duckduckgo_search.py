@@ -1,13 +1,35 @@
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from duckduckgo_search import DDGS
+import asyncio
 import logging
+import threading
+
+from services.agent_tools.result_cache import result_cache
+from services.utils.executors import run_blocking
+
+# Seconds a single search may take before it is reported as an error
+SEARCH_TIMEOUT_SECONDS = 15
+
+# One DDGS client (and its HTTP session) per worker thread, reused across queries
+_local = threading.local()
+
+
+def _get_client() -> DDGS:
+    client = getattr(_local, "ddgs", None)
+    if client is None:
+        client = DDGS()
+        _local.ddgs = client
+    return client
 
 
 class DuckDuckGoSearchArgs(BaseModel):
     """Arguments for DuckDuckGo search."""
-    query: str = Field(..., description="The search query")
+    query: Union[str, List[str]] = Field(
+        ...,
+        description="The search query, or a list of queries to run concurrently in one call"
+    )
     max_results: int = Field(default=5, description="Maximum number of results to return")
 
 
@@ -16,43 +38,66 @@ class DuckDuckGoSearchTool(BaseTool):
     name: str = "duckduckgo_search"
     description: str = "Search the web using DuckDuckGo"
     args_schema: type[BaseModel] = DuckDuckGoSearchArgs
-    
-    def _run(self, query: str, max_results: int = 5) -> List[dict]:
+
+    def _search(self, query: str, max_results: int = 5) -> List[dict]:
         """
-        Run DuckDuckGo search.
-        
+        Run a single DuckDuckGo search.
+
         Args:
             query: Search query
             max_results: Maximum number of results to return
-            
+
         Returns:
             List of search result dictionaries
         """
         try:
-            with DDGS() as ddgs:
-                # Get search results
-                results = []
-                for r in ddgs.text(query, max_results=max_results):
-                    # Extract fields with fallbacks
-                    title = r.get('title', '')
-                    url = r.get('href', '') 
-                    snippet = r.get('body', '')
-                    
-                    results.append({
-                        'title': title,
-                        'url': url,
-                        'snippet': snippet
-                    })
-                
+            # Get search results
+            results = []
+            for r in _get_client().text(query, max_results=max_results):
+                # Extract fields with fallbacks
+                title = r.get('title', '')
+                url = r.get('href', '')
+                snippet = r.get('body', '')
+
+                results.append({
+                    'title': title,
+                    'url': url,
+                    'snippet': snippet
+                })
+
             return results if results else [{"error": "No results found"}]
-            
+
         except Exception as e:
+            # Start over with a fresh session on the next query
+            _local.ddgs = None
             logging.error(f"DuckDuckGo search error: {str(e)}")
             return [{"error": f"Error searching DuckDuckGo: {str(e)}"}]
-    
-    async def _arun(self, query: str, max_results: int = 5) -> List[dict]:
-        """Async implementation of the tool."""
-        return self._run(query, max_results)
+
+    def _run(self, query: Union[str, List[str]], max_results: int = 5) -> Union[List[dict], Dict[str, List[dict]]]:
+        """Run DuckDuckGo search; a list of queries returns results keyed by query."""
+        if isinstance(query, list):
+            return {q: self._cached_search(q, max_results) for q in query}
+        return self._cached_search(query, max_results)
+
+    def _cached_search(self, query: str, max_results: int) -> List[dict]:
+        return result_cache.fetch(self.name, query, max_results, lambda: self._search(query, max_results))
+
+    async def _asearch(self, query: str, max_results: int) -> List[dict]:
+        try:
+            return await result_cache.afetch(
+                self.name, query, max_results,
+                lambda: run_blocking(self._search, query, max_results, timeout=SEARCH_TIMEOUT_SECONDS)
+            )
+        except asyncio.TimeoutError:
+            logging.error(f"DuckDuckGo search timed out: {query}")
+            return [{"error": f"DuckDuckGo search timed out after {SEARCH_TIMEOUT_SECONDS}s"}]
+
+    async def _arun(self, query: Union[str, List[str]], max_results: int = 5) -> Union[List[dict], Dict[str, List[dict]]]:
+        """Async implementation of the tool; runs searches on the shared tool pool."""
+        if isinstance(query, list):
+            results = await asyncio.gather(*(self._asearch(q, max_results) for q in query))
+            return dict(zip(query, results))
+        return await self._asearch(query, max_results)
 
 
 # Create tool instance
@@ -0,0 +1,26 @@
+from typing import Optional
+
+
+def extract_main_text(html: str, url: Optional[str] = None) -> str:
+    """Extract the main content of an HTML page, dropping navigation and other boilerplate.
+
+    Runs inside the extraction process pool, so it must stay a picklable top-level
+    function and import its (heavy) dependency lazily.
+
+    Args:
+        html: Raw HTML of the page
+        url: Page URL, used by the extractor to resolve links and metadata
+
+    Returns:
+        Extracted text, or an empty string if nothing could be extracted
+    """
+    import trafilatura
+
+    text = trafilatura.extract(
+        html,
+        url=url,
+        include_comments=False,
+        include_tables=True,
+        favor_recall=True,
+    )
+    return text or ""
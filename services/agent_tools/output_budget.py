@@ -0,0 +1,267 @@
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.tools import BaseTool
+
+from services.tracing import annotate, span
+from services.utils.executors import run_blocking
+from services.utils.passage_index import PassageIndex, current_passage_index
+from services.utils.text_splitter import count_tokens, count_tokens_batch, truncate_to_tokens
+
+# Tokens a single tool call may add to the agent scratchpad, and all calls of one turn together
+CALL_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_CALL_TOKENS", "8000"))
+TURN_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TURN_TOKENS", "32000"))
+# Per-tool overrides of CALL_TOKEN_BUDGET; transcripts are usually the material the answer is built from
+TOOL_CALL_BUDGETS = {
+    "youtube_transcript_loader_tool": 16000,
+}
+# Tools whose full results are added to the conversation's passage index, with the
+# argument naming the source of each result. Indexed results can be searched with
+# passage_search later, so only INDEXED_CALL_TOKEN_BUDGET tokens of them are shown at once.
+INDEXED_TOOLS = {
+    "web_scraper": "web_links",
+    "youtube_transcript_loader_tool": "youtube_video_links",
+}
+INDEXED_CALL_TOKEN_BUDGET = int(os.getenv("INDEXED_TOOL_OUTPUT_CALL_TOKENS", "2000"))
+# Lines shorter than this (headings, list bullets) are never dropped as duplicates
+MIN_DEDUPE_LINE_CHARS = 80
+
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+
+
+class TurnBudget:
+    """Tool output budget of one agent turn.
+
+    Tracks how many tokens the turn's tool results may still add to the scratchpad,
+    which lines and results were already seen (so repeats are dropped), and how many
+    tokens each tool produced and how many were kept.
+    """
+
+    def __init__(self, model_name: str = "gpt-4o", turn_tokens: int = TURN_TOKEN_BUDGET,
+                 call_tokens: int = CALL_TOKEN_BUDGET, tool_call_tokens: Optional[Dict[str, int]] = None):
+        self.model_name = model_name
+        self.remaining = turn_tokens
+        self.call_tokens = call_tokens
+        self.tool_call_tokens = tool_call_tokens if tool_call_tokens is not None else TOOL_CALL_BUDGETS
+        self._seen_lines: Set[str] = set()
+        self._seen_results: Set[str] = set()
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, tool_name: str, output: Any, indexed: bool = False) -> Any:
+        """Compress, deduplicate and trim one tool result to fit the budget.
+
+        Strings and lists of strings or Documents keep their shape; any other result
+        that has to be trimmed is returned as its (trimmed) JSON text.
+
+        Args:
+            tool_name: Name of the tool that produced the output
+            output: Tool result
+            indexed: Whether the full result is in the passage index, in which case
+                the tighter INDEXED_CALL_TOKEN_BUDGET applies
+        """
+        original, rebuild = _texts(output)
+        with self._lock:
+            produced = count_tokens_batch(original, self.model_name)
+            texts = [self._dedupe(text) for text in original]
+            counts = count_tokens_batch(texts, self.model_name)
+
+            call_limit = min(self.tool_call_tokens.get(tool_name, self.call_tokens), max(self.remaining, 0))
+            if indexed:
+                call_limit = min(call_limit, INDEXED_CALL_TOKEN_BUDGET)
+            shares = _fair_shares(counts, call_limit)
+            kept_texts = []
+            for text, count, share in zip(texts, counts, shares):
+                if count > share:
+                    text = truncate_to_tokens(text, share, self.model_name)
+                    omitted = count - count_tokens(text, self.model_name)
+                    if indexed:
+                        text += f"\n[... truncated, {omitted} more tokens omitted; use passage_search to find details]"
+                    else:
+                        text += f"\n[... truncated, {omitted} more tokens omitted]"
+                kept_texts.append(text)
+            kept = sum(count_tokens_batch(kept_texts, self.model_name))
+
+            self.remaining -= kept
+            usage = self._usage.setdefault(tool_name, {"calls": 0, "produced": 0, "kept": 0})
+            usage["calls"] += 1
+            usage["produced"] += sum(produced)
+            usage["kept"] += kept
+        annotate(tokens_produced=sum(produced), tokens_kept=kept, indexed=indexed)
+
+        if kept_texts == original:
+            return output
+        return rebuild(kept_texts)
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """Return calls, produced tokens and kept tokens per tool."""
+        with self._lock:
+            return {tool: dict(usage) for tool, usage in self._usage.items()}
+
+    def _dedupe(self, text: str) -> str:
+        if text.startswith("Error:") or len(text) < MIN_DEDUPE_LINE_CHARS:
+            return text
+        result_hash = _hash(text)
+        if result_hash in self._seen_results:
+            return "[Duplicate of an earlier result in this conversation turn, omitted]"
+        self._seen_results.add(result_hash)
+
+        text = _BLANK_LINES.sub("\n\n", _TRAILING_SPACE.sub("\n", text)).strip()
+        lines = []
+        for line in text.split("\n"):
+            if len(line) >= MIN_DEDUPE_LINE_CHARS:
+                line_hash = _hash(" ".join(line.split()))
+                if line_hash in self._seen_lines:
+                    continue
+                self._seen_lines.add(line_hash)
+            lines.append(line)
+        return "\n".join(lines)
+
+
+_current_turn: contextvars.ContextVar[Optional[TurnBudget]] = contextvars.ContextVar("tool_output_turn", default=None)
+
+
+def start_turn(model_name: str, turn_tokens: int = TURN_TOKEN_BUDGET) -> TurnBudget:
+    """Start a fresh tool output budget for the agent turn running in the current context."""
+    budget = TurnBudget(model_name, turn_tokens=turn_tokens)
+    _current_turn.set(budget)
+    return budget
+
+
+def current_turn() -> Optional[TurnBudget]:
+    """Return the budget of the turn running in the current context, if any."""
+    return _current_turn.get()
+
+
+class BudgetedTool(BaseTool):
+    """Wraps a tool so its results pass through the current turn's output budget."""
+    tool: BaseTool
+
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        super().__init__(tool=tool, name=tool.name, description=tool.description,
+                         args_schema=tool.args_schema, **kwargs)
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        with span(self.name, "tool", input=_preview(kwargs)):
+            return self._apply(self.tool._run(*args, **kwargs), kwargs)
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        with span(self.name, "tool", input=_preview(kwargs)):
+            output = await self.tool._arun(*args, **kwargs)
+            # Indexing, deduplicating, counting and trimming whole pages or transcripts is
+            # CPU-bound and this coroutine runs on the event loop every session shares; the
+            # copied context carries the passage index and keeps the tool span current
+            return await run_blocking(contextvars.copy_context().run, self._apply, output, kwargs,
+                                      pool="tool_output")
+
+    def _apply(self, output: Any, arguments: Dict[str, Any]) -> Any:
+        indexed = self._index(output, arguments)
+        return _turn_budget().apply(self.name, output, indexed)
+
+    def _index(self, output: Any, arguments: Dict[str, Any]) -> bool:
+        index = current_passage_index()
+        if index is None or self.name not in INDEXED_TOOLS:
+            return False
+        return _index_output(index, output, arguments.get(INDEXED_TOOLS[self.name]))
+
+
+def _turn_budget() -> TurnBudget:
+    # Calls outside an agent turn only get the per-call limit
+    return current_turn() or TurnBudget()
+
+
+_wrapped: Dict[int, BudgetedTool] = {}
+_wrapped_lock = threading.Lock()
+
+
+def with_output_budget(tools: List[BaseTool]) -> List[BaseTool]:
+    """Return the tools wrapped in BudgetedTool.
+
+    Wrappers are created once per tool, so executors cached by tool identity are reused.
+    """
+    with _wrapped_lock:
+        wrapped = []
+        for tool in tools:
+            if isinstance(tool, BudgetedTool):
+                wrapped.append(tool)
+                continue
+            if id(tool) not in _wrapped:
+                _wrapped[id(tool)] = BudgetedTool(tool)
+            wrapped.append(_wrapped[id(tool)])
+        return wrapped
+
+
+def _index_output(index: PassageIndex, output: Any, sources: Any) -> bool:
+    """Add the texts of a tool result to the passage index; returns whether anything was indexed."""
+    if isinstance(output, (str, Document)):
+        output = [output]
+    if isinstance(sources, str):
+        sources = [sources]
+    if not isinstance(output, list):
+        return False
+    sources = list(sources or [])
+    indexed = False
+    for i, item in enumerate(output):
+        if isinstance(item, Document):
+            text, source = item.page_content, item.metadata.get("source", "")
+        elif isinstance(item, str):
+            text, source = item, sources[i] if i < len(sources) else ""
+        else:
+            continue
+        if text and not text.startswith("Error:"):
+            index.add(text, source)
+            indexed = True
+    return indexed
+
+
+def _texts(output: Any) -> Tuple[List[str], Callable[[List[str]], Any]]:
+    """Split a tool result into texts to budget and a function rebuilding it from them."""
+    if isinstance(output, str):
+        return [output], lambda texts: texts[0]
+    if isinstance(output, list) and all(isinstance(item, (str, Document)) for item in output):
+        def rebuild(texts: List[str]) -> List[Any]:
+            return [
+                text if isinstance(item, str) else Document(page_content=text, metadata=item.metadata)
+                for item, text in zip(output, texts)
+            ]
+        return [item if isinstance(item, str) else item.page_content for item in output], rebuild
+    try:
+        text = json.dumps(output, ensure_ascii=False)
+    except (TypeError, ValueError):
+        text = str(output)
+    return [text], lambda texts: texts[0]
+
+
+def _preview(arguments: Dict[str, Any], limit: int = 200) -> str:
+    text = json.dumps(arguments, ensure_ascii=False, default=str)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _fair_shares(counts: List[int], limit: int) -> List[int]:
+    """Split `limit` tokens across results: small results are kept whole and what they
+    leave over is shared equally by the larger ones."""
+    shares = [0] * len(counts)
+    pending = sorted(range(len(counts)), key=lambda i: counts[i])
+    while pending:
+        share = limit // len(pending)
+        i = pending[0]
+        if counts[i] <= share:
+            shares[i] = counts[i]
+            limit -= counts[i]
+            pending.pop(0)
+        else:
+            for i in pending:
+                shares[i] = share
+            break
+    return shares
+
+
+def _hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
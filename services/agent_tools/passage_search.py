@@ -0,0 +1,42 @@
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+from typing import List, Union
+
+from services.utils.passage_index import current_passage_index
+
+
+class PassageSearchArgs(BaseModel):
+    """Arguments for searching loaded pages and transcripts."""
+    query: str = Field(..., description="What to look for in the pages and transcripts loaded so far")
+    k: int = Field(default=5, description="Number of passages to return")
+
+
+class PassageSearchTool(BaseTool):
+    """Tool returning the passages of already loaded content that best match a query."""
+    name: str = "passage_search"
+    description: str = (
+        "Search the web pages and YouTube transcripts already loaded in this conversation "
+        "and return only the most relevant passages. Use it to look up details instead of "
+        "loading the same content again."
+    )
+    args_schema: type[BaseModel] = PassageSearchArgs
+
+    def _run(self, query: str, k: int = 5) -> Union[List[dict], str]:
+        """Run a BM25 search over the conversation's passage index."""
+        index = current_passage_index()
+        if index is None or not len(index):
+            return "Error: No web pages or transcripts have been loaded in this conversation yet."
+        results = index.search(query, k)
+        if not results:
+            return f"No passages match: {query}"
+        return [
+            {"source": passage.source, "passage": passage.position, "score": round(score, 2), "text": passage.text}
+            for passage, score in results
+        ]
+
+    async def _arun(self, query: str, k: int = 5) -> Union[List[dict], str]:
+        return self._run(query, k)
+
+
+# Create tool instance
+passage_search_tool = PassageSearchTool()
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Seconds a result stays fresh, per tool name
+TOOL_TTLS = {
+    "duckduckgo_search": 15 * 60,
+    "youtube_search": 60 * 60,
+    "wikipedia": 24 * 3600,
+}
+DEFAULT_TTL = 10 * 60
+
+# Only sentence-final marks are dropped; symbols such as "+" and "#" change what a query means
+_TRAILING_MARKS = re.compile(r"[?!.\s]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups: case, whitespace and trailing ?/!/. are ignored."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _TRAILING_MARKS.sub("", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class ResultCache:
+    """Bounded in-memory TTL cache for search-style tool results, shared by all sessions.
+
+    Entries are keyed by tool name and normalized query. Each entry remembers the
+    `max_results` it was fetched with, so a request for fewer results is answered by
+    slicing a larger cached result.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttls = ttls if ttls is not None else TOOL_TTLS
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[int, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+
+    def get(self, tool: str, query: str, max_results: int) -> Optional[Any]:
+        """Return cached results able to answer this request, or None."""
+        key = (tool, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_max, results, expires_at = entry
+                # A result shorter than its max_results is already everything there is
+                exhaustive = isinstance(results, list) and len(results) < cached_max
+                if expires_at <= time.time():
+                    del self._entries[key]
+                elif cached_max >= max_results or exhaustive:
+                    self._entries.move_to_end(key)
+                    self._hits[tool] = self._hits.get(tool, 0) + 1
+                    return results[:max_results] if isinstance(results, list) else results
+            self._misses[tool] = self._misses.get(tool, 0) + 1
+            return None
+
+    def set(self, tool: str, query: str, max_results: int, results: Any) -> None:
+        """Store results unless they are an error or a larger fresh result is already cached."""
+        if _is_error(results):
+            return
+        key = (tool, normalize_query(query))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > max_results and entry[2] > now:
+                return
+            self._entries[key] = (max_results, results, now + self.ttls.get(tool, self.default_ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def fetch(self, tool: str, query: str, max_results: int, fetch: Callable[[], Any]) -> Any:
+        """Return cached results or call `fetch()` and cache what it returns."""
+        results = self.get(tool, query, max_results)
+        if results is None:
+            results = fetch()
+            self.set(tool, query, max_results, results)
+        return results
+
+    async def afetch(self, tool: str, query: str, max_results: int, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of fetch()."""
+        results = self.get(tool, query, max_results)
+        if results is None:
+            results = await fetch()
+            self.set(tool, query, max_results, results)
+        return results
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return hits, misses and hit rate per tool."""
+        with self._lock:
+            tools = set(self._hits) | set(self._misses)
+            report = {}
+            for tool in sorted(tools):
+                hits, misses = self._hits.get(tool, 0), self._misses.get(tool, 0)
+                report[tool] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            return report
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+
+
+def _is_error(results: Any) -> bool:
+    if isinstance(results, list):
+        return any(isinstance(r, dict) and "error" in r for r in results)
+    return False
+
+
+result_cache = ResultCache()
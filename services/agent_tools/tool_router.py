@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from services.prompts.tools import tool_prompt
+from services.utils.text_splitter import count_tokens
+
+# Set TOOL_ROUTING=0 to bind the whole toolkit on every turn
+ROUTING_ENABLED = os.getenv("TOOL_ROUTING", "1") != "0"
+
+_URL = re.compile(r"https?://\S+|\bwww\.\S+", re.IGNORECASE)
+_YOUTUBE_URL = re.compile(r"(youtube\.com/|youtu\.be/)", re.IGNORECASE)
+
+# Tool name -> words that hint the tool may be needed. A hint never narrows the toolkit on
+# its own; it only keeps a message from being routed to fewer tools
+TOOL_RULES: Dict[str, re.Pattern] = {
+    "youtube_search": re.compile(r"\b(youtube|videos?|vlogs?|channels?|youtubers?)\b", re.IGNORECASE),
+    "youtube_transcript_loader_tool": re.compile(r"\btranscripts?\b", re.IGNORECASE),
+    "web_scraper": re.compile(r"\b(scrape|web ?pages?|websites?|articles?|blog posts?|links?)\b", re.IGNORECASE),
+    "duckduckgo_search": re.compile(
+        r"\b(search|google|look up|latest|recent|news|current|today|trends?|trending|research|sources?|"
+        r"statistics|stats)\b|\b20\d\d\b",
+        re.IGNORECASE,
+    ),
+    "wikipedia": re.compile(r"\b(wikipedia|wiki|who (is|was)|history of|biography|define|definition)\b",
+                            re.IGNORECASE),
+}
+# passage_search is only useful once pages or transcripts have been loaded in the conversation
+PASSAGE_TOOL = "passage_search"
+_PASSAGE_REFERENCE = re.compile(
+    r"\b(transcripts?|articles?|pages?|videos?|sources?|earlier|above|mentioned|quotes?|said)\b", re.IGNORECASE
+)
+# Words that describe a linked page or video rather than ask for another tool
+_LINK_NOUNS = re.compile(
+    r"\b(this|that|the|these|those)\s+(youtube\s+)?(videos?|articles?|web ?pages?|pages?|blog posts?|posts?|links?|"
+    r"sites?|websites?|transcripts?)\b",
+    re.IGNORECASE,
+)
+
+# Messages that are nothing but a greeting or thanks
+_GREETING = re.compile(
+    r"^[\W_]*((ok(ay)?|great|perfect|awesome|cool|nice)[\W_]+)?"
+    r"(hi|hello|hey|thanks|thank you|thx|cheers)(\s+(there|so much|very much|a lot|again))?[\W_]*$",
+    re.IGNORECASE,
+)
+_EDIT_VERB = (
+    r"^[\W_]*(please\s+)?((can|could|would) you\s+)?(please\s+)?"
+    r"(rewrite|rephrase|reword|paraphrase|shorten|lengthen|expand|condense|proofread|edit|polish|translate|fix|"
+    r"correct|improve|simplify|summari[sz]e|format|tweak|redo|make|turn)\b"
+)
+_TEXT_NOUNS = (
+    r"(text|paragraphs?|drafts?|posts?|answers?|responses?|repl(y|ies)|messages?|emails?|intro(duction)?|"
+    r"conclusion|outline|summary|sentences?|sections?|script|version|copy|captions?|titles?|headlines?|lists?|"
+    r"bullets?|bullet points|points|tweets?|thread|hook|wording|one)"
+)
+# An edit verb aimed at text already in the conversation: "rewrite it", "make this shorter",
+# "shorten the above", "polish my draft"
+_EDIT_EXISTING = re.compile(
+    _EDIT_VERB + r"\s+("
+    r"(it|them)\b"
+    r"|(the\s+)?above\b"
+    r"|(this|that|these|those)\s*($|[^\w\s]|(to|into|in|for|so|as|and|with|more|less|a bit|slightly)\b)"
+    r"|(this|that|these|those|the|my|your)\s+((previous|last|first|second|above|whole|same|new)\s+)?"
+    + _TEXT_NOUNS + r"\b)",
+    re.IGNORECASE,
+)
+# An edit verb followed by the text to work on: "Proofread: <pasted text>"
+_EDIT_PASTED = re.compile(_EDIT_VERB + r"[^\n:]{0,80}[:\n]\s*(?P<text>\S.*)", re.IGNORECASE | re.DOTALL)
+PASTED_MIN_WORDS = 8
+
+_stats = {"turns": 0, "no_tools": 0, "subset": 0, "full": 0, "schema_tokens_saved": 0}
+_schema_tokens: Dict[Tuple[str, int, str], int] = {}
+_lock = threading.Lock()
+
+
+class ToolRoute(NamedTuple):
+    tools: List[BaseTool]
+    reason: str  # "no_tools", "subset" or "full"
+    schema_tokens: int  # tool schema (and tool prompt) tokens sent with each model call
+    saved_tokens: int  # tokens saved per model call compared with binding the whole toolkit
+
+
+def schema_tokens(tools: List[BaseTool], model_name: str = "gpt-4o") -> int:
+    """Tokens of the JSON schemas sent to the model for `tools`, counted once per tool."""
+    total = 0
+    for tool in tools:
+        key = (tool.name, id(tool), model_name)
+        count = _schema_tokens.get(key)
+        if count is None:
+            count = count_tokens(json.dumps(convert_to_openai_tool(tool)), model_name)
+            with _lock:
+                _schema_tokens[key] = count
+        total += count
+    return total
+
+
+def _is_text_only(query: str) -> bool:
+    """Whether the whole message is a greeting or thanks, or asks to edit text that is
+    already in the conversation (or pasted into the message)."""
+    if _GREETING.match(query) or _EDIT_EXISTING.match(query):
+        return True
+    pasted = _EDIT_PASTED.match(query)
+    return pasted is not None and len(pasted.group("text").split()) >= PASTED_MIN_WORDS
+
+
+def select_tools(query: str, tool_names: List[str], passages_indexed: bool = False) -> Optional[List[str]]:
+    """Pick the tools a query needs with keyword rules.
+
+    Only a clear signal narrows the toolkit: links in the message bind the loaders for
+    them, as long as nothing else in the message hints at another tool. Keyword hints
+    alone keep the whole toolkit.
+
+    Returns:
+        The selected tool names (empty for a text-only request), or None when the
+        whole toolkit should be bound
+    """
+    urls = _URL.findall(query)
+    text = _URL.sub(" ", query)
+    if urls:
+        text = _LINK_NOUNS.sub(" ", text)
+    hinted = {name for name, pattern in TOOL_RULES.items() if pattern.search(text)}
+
+    if urls:
+        selected = {"youtube_transcript_loader_tool" if _YOUTUBE_URL.search(url) else "web_scraper" for url in urls}
+        if not hinted <= selected:
+            return None
+        if passages_indexed:
+            selected.add(PASSAGE_TOOL)
+        return [name for name in tool_names if name in selected]
+
+    if hinted or (passages_indexed and _PASSAGE_REFERENCE.search(query)):
+        return None
+    return [] if _is_text_only(query) else None
+
+
+def route_tools(query: str, tools: List[BaseTool], model_name: str = "gpt-4o",
+                passages_indexed: bool = False) -> ToolRoute:
+    """Choose the tools to bind for one turn and account for the schema tokens saved.
+
+    Tools outside the routing rules (e.g. extra tools passed to the generator) are
+    bound whenever any tool is.
+
+    Args:
+        query: The user's message for this turn
+        tools: Every tool available to the agent
+        model_name: Model whose tokenizer counts the saved tokens
+        passages_indexed: Whether the conversation's passage index has any passages
+
+    Returns:
+        A ToolRoute; with no tools the tool prompt is dropped too and counted as saved
+    """
+    full_tokens = schema_tokens(tools, model_name) + count_tokens(tool_prompt, model_name)
+    selected = select_tools(query, [tool.name for tool in tools], passages_indexed) if ROUTING_ENABLED else None
+
+    if selected is None:
+        route = ToolRoute(tools, "full", full_tokens, 0)
+    elif not selected:
+        route = ToolRoute([], "no_tools", 0, full_tokens)
+    else:
+        known = set(TOOL_RULES) | {PASSAGE_TOOL}
+        subset = [tool for tool in tools if tool.name in selected or tool.name not in known]
+        tokens = schema_tokens(subset, model_name) + count_tokens(tool_prompt, model_name)
+        route = ToolRoute(subset, "subset" if len(subset) < len(tools) else "full", tokens, full_tokens - tokens)
+
+    with _lock:
+        _stats["turns"] += 1
+        _stats[route.reason] += 1
+        _stats["schema_tokens_saved"] += route.saved_tokens
+    return route
+
+
+def router_stats() -> Dict[str, int]:
+    """Turns routed to no tools, a subset or the full toolkit, and schema tokens saved per model call."""
+    with _lock:
+        return dict(_stats)
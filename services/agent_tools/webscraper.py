@@ -1,9 +1,107 @@
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import List, Union
-from langchain.docstore.document import Document
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urldefrag, urlparse
+from langchain_core.documents import Document
 import asyncio
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+import logging
+import os
+import time
+from collections import OrderedDict
+import httpx
+from playwright.async_api import Page, Route, TimeoutError as PlaywrightTimeout
+
+from services.agent_tools.browser_pool import browser_pool
+from services.agent_tools.html_extract import extract_main_text
+from services.utils.disk_cache import CACHE_DIR, DiskCache
+from services.utils.executors import run_in_process
+from services.utils.http_client import get_http_client
+
+
+# Domains whose content is rendered client-side; always scraped with the browser
+JS_REQUIRED_DOMAINS = {'x.com', 'twitter.com', 'instagram.com', 'facebook.com', 'linkedin.com', 'tiktok.com'}
+# Pages larger than this are left to the browser
+MAX_HTTP_BYTES = 5 * 1024 * 1024
+EXTRACT_TIMEOUT_SECONDS = 20
+
+# Scraped pages are served from cache for PAGE_TTL_SECONDS, then revalidated with
+# conditional requests; news sites change faster than most pages
+PAGE_TTL_SECONDS = 6 * 3600
+DOMAIN_TTL_SECONDS = {
+    'news.ycombinator.com': 5 * 60,
+    'reddit.com': 15 * 60,
+    'cnn.com': 15 * 60,
+    'bbc.com': 15 * 60,
+    'bbc.co.uk': 15 * 60,
+    'reuters.com': 15 * 60,
+    'wikipedia.org': 24 * 3600,
+}
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+page_cache = DiskCache(os.path.join(CACHE_DIR, "pages.sqlite3"), PAGE_CACHE_MAX_BYTES, compress=True)
+
+# Domains found to need the browser at runtime are sent straight to it for this long,
+# and at most this many are remembered (least recently learned first out)
+LEARNED_JS_TTL_SECONDS = 6 * 3600
+LEARNED_JS_MAX_DOMAINS = 1000
+
+# Domain -> monotonic time until which it is scraped with the browser only
+_learned_js_domains: "OrderedDict[str, float]" = OrderedDict()
+_stats = {"http": 0, "browser": 0, "escalated": 0, "revalidated": 0, "js_domains_learned": 0}
+
+# Resource types that never contribute text; aborted when `block_resources` is enabled.
+# Stylesheets are still loaded: the visibility checks below need computed styles to skip
+# hidden navigation, modals and cookie banners.
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'texttrack', 'manifest'}
+
+# Extracts the main content, or else all visible text. Visibility is computed once per
+# element and hidden subtrees are skipped entirely, instead of styling every text node's parent.
+EXTRACT_TEXT_SCRIPT = """() => {
+    const SKIPPED_TAGS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'CANVAS', 'IFRAME']);
+
+    function isVisible(element) {
+        if (element.hidden) {
+            return false;
+        }
+        const style = window.getComputedStyle(element);
+        return style.display !== 'none' && 
+               style.visibility !== 'hidden' && 
+               style.opacity !== '0';
+    }
+
+    // Try to get main content first
+    const mainSelectors = ['main', 'article', '[role="main"]', '#content', '.content'];
+    for (const selector of mainSelectors) {
+        const element = document.querySelector(selector);
+        if (element && isVisible(element)) {
+            return element.innerText;
+        }
+    }
+
+    // Fallback: one pass over elements and text nodes in document order
+    const textNodes = [];
+    const walker = document.createTreeWalker(
+        document.body,
+        NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+        {
+            acceptNode: (node) => {
+                if (node.nodeType === Node.ELEMENT_NODE) {
+                    if (SKIPPED_TAGS.has(node.tagName.toUpperCase()) || !isVisible(node)) {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+                    return NodeFilter.FILTER_SKIP;
+                }
+                return node.textContent.trim() ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_REJECT;
+            }
+        }
+    );
+
+    while (walker.nextNode()) {
+        textNodes.push(walker.currentNode.textContent.trim());
+    }
+    
+    return textNodes.join('\\n');
+}"""
 
 
 class RetrieveDataArgs(BaseModel):
@@ -17,89 +115,160 @@ class AsyncWebScraper(BaseTool):
         default="Use this tool to scrape web data, like news, articles, and blogs etc."
     )
     args_schema: type[BaseModel] = Field(default=RetrieveDataArgs)
+    # Abort images, fonts and media, and stop waiting once the page has loaded
+    # instead of waiting for network idle (which analytics beacons can postpone indefinitely)
+    block_resources: bool = Field(default=True)
+    # Try a plain HTTP fetch with boilerplate removal first; fall back to Chromium only when
+    # the extracted text is shorter than `min_http_chars` or the domain is known to need JS
+    http_first: bool = Field(default=True)
+    min_http_chars: int = Field(default=500)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+    async def _scrape_cached(self, url: str) -> Tuple[str, str, str]:
+        """Serve a page from the page cache, revalidating it with a conditional request once stale.
+
+        Returns:
+            Tuple of (text, path that originally served it, cache status: "hit", "revalidated" or "miss")
+        """
+        key = _cache_key(url)
+        ttl = page_ttl(url)
+        entry = await asyncio.to_thread(page_cache.lookup, key)
+        response = None
+        if entry is not None:
+            if not entry.expired:
+                return entry.value.decode("utf-8"), entry.meta.get("fetched_via", "http"), "hit"
+            conditional_headers = _conditional_headers(entry.meta)
+            if conditional_headers:
+                response = await self._http_get(url, conditional_headers)
+                if response is not None and response.status_code == 304:
+                    await asyncio.to_thread(page_cache.touch, key, ttl)
+                    _stats["revalidated"] += 1
+                    return entry.value.decode("utf-8"), entry.meta.get("fetched_via", "http"), "revalidated"
+
+        content, fetched_via, validators = await self._scrape_url(url, response)
+        if content and not content.startswith("Error:"):
+            await page_cache.aset(key, content.encode("utf-8"), ttl=ttl,
+                                  meta={"fetched_via": fetched_via, **validators})
+        return content, fetched_via, "miss"
+
+    async def _scrape_url(self, url: str, response: Optional[httpx.Response] = None
+                          ) -> Tuple[str, str, Dict[str, str]]:
+        """Scrape a page, returning its text, the path that served it ("http" or "browser")
+        and the HTTP validators (ETag / Last-Modified) to revalidate it with later.
+
+        Args:
+            url: Page URL
+            response: An already fetched HTTP response for the page, if any
+        """
+        domain = _domain(url)
+        if self.http_first and domain not in JS_REQUIRED_DOMAINS and not _is_learned_js_domain(domain):
+            if response is None or response.status_code != 200:
+                response = await self._http_get(url)
+            text = await self._extract(response) if response is not None else None
+            if text and len(text) >= self.min_http_chars:
+                _stats["http"] += 1
+                return text, "http", _validators(response)
+            _stats["escalated"] += 1
+            content = await self._scrape_with_playwright(url)
+            if content.startswith("Error:") and text:
+                # Short HTTP text beats a browser error
+                _stats["http"] += 1
+                return text, "http", _validators(response)
+            # Remember domains where the browser finds much more than plain HTTP did. Only a
+            # 200 HTML page with short extracted text counts: a timeout, an error status, a
+            # non-HTML or oversized response says nothing about how the site renders
+            if (text is not None and not content.startswith("Error:")
+                    and len(content) >= max(self.min_http_chars, 2 * len(text))):
+                _learn_js_domain(domain)
+        else:
+            content = await self._scrape_with_playwright(url)
+        _stats["browser"] += 1
+        return content, "browser", {}
+
+    async def _http_get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[httpx.Response]:
+        """GET a page over the pooled HTTP client.
+
+        The body is streamed and the download stops as soon as Content-Length or the
+        bytes read pass MAX_HTTP_BYTES; such pages are left to the browser.
+
+        Returns:
+            The response with its body read, or None on network errors and oversized pages
+        """
+        try:
+            async with get_http_client().stream("GET", url, headers=headers) as response:
+                declared = response.headers.get('content-length', '')
+                if declared.isdigit() and int(declared) > MAX_HTTP_BYTES:
+                    logging.info(f"{url} declares {declared} bytes, escalating to browser")
+                    return None
+                chunks: List[bytes] = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > MAX_HTTP_BYTES:
+                        logging.info(f"{url} is larger than {MAX_HTTP_BYTES} bytes, escalating to browser")
+                        return None
+                    chunks.append(chunk)
+        except Exception as e:
+            logging.info(f"HTTP fetch of {url} failed, escalating to browser: {str(e)}")
+            return None
+        return _buffered(response, b"".join(chunks))
+
+    async def _extract(self, response: httpx.Response) -> Optional[str]:
+        """Extract the main text of an HTML response in the process pool.
+
+        Returns:
+            Extracted text, or None if the response is not a usable HTML page
+        """
+        content_type = response.headers.get('content-type', '')
+        if response.status_code != 200 or 'html' not in content_type:
+            return None
+        try:
+            return await run_in_process(extract_main_text, response.text, str(response.url),
+                                        pool="html_extract", timeout=EXTRACT_TIMEOUT_SECONDS)
+        except Exception as e:
+            logging.info(f"Extraction of {response.url} failed, escalating to browser: {str(e)}")
+            return None
+
     async def _scrape_with_playwright(self, url: str) -> str:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--disable-web-security', '--disable-features=IsolateOrigins,site-per-process']
-            )
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
+        return await browser_pool.run(lambda page: self._scrape_page(page, url))
+
+    async def _scrape_page(self, page: Page, url: str) -> str:
+        try:
+            if self.block_resources:
+                await page.route("**/*", _block_non_document_resources)
+
+            # Navigate with optimized strategy
+            await page.goto(url, wait_until='domcontentloaded', timeout=15000)
             
-            page = await context.new_page()
+            # Efficiently wait for content; a page that never settles is scraped as is
             try:
-                # Navigate with optimized strategy
-                await page.goto(url, wait_until='domcontentloaded', timeout=15000)
-                
-                # Efficiently wait for content
-                await page.wait_for_load_state('networkidle', timeout=5000)
-                
-                # Handle cookie consent without delay
-                try:
-                    for button_text in ['Accept', 'Accept All', 'Continue', 'Got it']:
-                        button = page.get_by_text(button_text, exact=False)
-                        if await button.count() > 0:
-                            await button.click()
-                except Exception:
-                    pass
-
-                # Optimized content extraction
-                content = await page.evaluate("""() => {
-                    function isVisible(element) {
-                        const style = window.getComputedStyle(element);
-                        return style.display !== 'none' && 
-                               style.visibility !== 'hidden' && 
-                               style.opacity !== '0';
-                    }
+                if self.block_resources:
+                    await page.wait_for_load_state('load', timeout=3000)
+                else:
+                    await page.wait_for_load_state('networkidle', timeout=5000)
+            except PlaywrightTimeout:
+                pass
+            
+            # Handle cookie consent without delay
+            try:
+                for button_text in ['Accept', 'Accept All', 'Continue', 'Got it']:
+                    button = page.get_by_text(button_text, exact=False)
+                    if await button.count() > 0:
+                        await button.click()
+            except Exception:
+                pass
 
-                    // Try to get main content first
-                    const mainSelectors = ['main', 'article', '[role="main"]', '#content', '.content'];
-                    for (const selector of mainSelectors) {
-                        const element = document.querySelector(selector);
-                        if (element && isVisible(element)) {
-                            return element.innerText;
-                        }
-                    }
+            # Optimized content extraction
+            content = await page.evaluate(EXTRACT_TEXT_SCRIPT)
+            
+            return content.strip()
 
-                    // Fallback: get all visible text content efficiently
-                    const textNodes = [];
-                    const walker = document.createTreeWalker(
-                        document.body,
-                        NodeFilter.SHOW_TEXT,
-                        {
-                            acceptNode: (node) => {
-                                if (!node.parentElement || !isVisible(node.parentElement)) {
-                                    return NodeFilter.FILTER_REJECT;
-                                }
-                                const text = node.textContent.trim();
-                                return text ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_REJECT;
-                            }
-                        }
-                    );
-
-                    while (walker.nextNode()) {
-                        textNodes.push(walker.currentNode.textContent.trim());
-                    }
-                    
-                    return textNodes.join('\\n');
-                }""")
-                
-                return content.strip()
-
-            except PlaywrightTimeout as e:
-                return f"Error: Timeout while loading {url}: {str(e)}"
-            except Exception as e:
-                return f"Error: Failed to scrape {url}: {str(e)}"
-            finally:
-                await page.close()
-                await context.close()
-                await browser.close()
+        except PlaywrightTimeout as e:
+            return f"Error: Timeout while loading {url}: {str(e)}"
+        except Exception as e:
+            return f"Error: Failed to scrape {url}: {str(e)}"
 
     async def _arun(self, web_links: Union[List[str], str]) -> List[Document]:
         """Run web scraping asynchronously.
@@ -116,7 +285,7 @@ class AsyncWebScraper(BaseTool):
             
         tasks = []
         for url in web_links:
-            tasks.append(self._scrape_with_playwright(url))
+            tasks.append(self._scrape_cached(url))
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
         documents = []
@@ -125,8 +294,12 @@ class AsyncWebScraper(BaseTool):
             if isinstance(result, Exception):
                 print(f"Error scraping {url}: {str(result)}")
                 continue
-            if result:
-                documents.append(Document(page_content=result, metadata={"source": url}))
+            content, fetched_via, cache_status = result
+            if content:
+                documents.append(Document(
+                    page_content=content,
+                    metadata={"source": url, "fetched_via": fetched_via, "cache": cache_status}
+                ))
 
         return documents
 
@@ -134,4 +307,86 @@ class AsyncWebScraper(BaseTool):
         raise NotImplementedError("This tool only supports async execution")
 
 
+def _domain(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _is_learned_js_domain(domain: str) -> bool:
+    expires = _learned_js_domains.get(domain)
+    if expires is None:
+        return False
+    if expires <= time.monotonic():
+        _learned_js_domains.pop(domain, None)
+        return False
+    return True
+
+
+def _learn_js_domain(domain: str) -> None:
+    _learned_js_domains.pop(domain, None)
+    _learned_js_domains[domain] = time.monotonic() + LEARNED_JS_TTL_SECONDS
+    _stats["js_domains_learned"] += 1
+    while len(_learned_js_domains) > LEARNED_JS_MAX_DOMAINS:
+        _learned_js_domains.popitem(last=False)
+
+
+def _cache_key(url: str) -> str:
+    # Fragments never change what the server returns
+    return urldefrag(url.strip())[0]
+
+
+def page_ttl(url: str) -> float:
+    """Freshness window for a URL, honouring per-domain overrides (including parent domains)."""
+    domain = _domain(url)
+    while domain:
+        if domain in DOMAIN_TTL_SECONDS:
+            return DOMAIN_TTL_SECONDS[domain]
+        domain = domain.partition(".")[2]
+    return PAGE_TTL_SECONDS
+
+
+def _buffered(response: httpx.Response, body: bytes) -> httpx.Response:
+    """A complete response holding an already decoded body read from a streamed one."""
+    headers = [(name, value) for name, value in response.headers.multi_items()
+               if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')]
+    return httpx.Response(response.status_code, headers=headers, content=body, request=response.request)
+
+
+def _validators(response: httpx.Response) -> Dict[str, str]:
+    validators = {}
+    if response.headers.get('etag'):
+        validators["etag"] = response.headers['etag']
+    if response.headers.get('last-modified'):
+        validators["last_modified"] = response.headers['last-modified']
+    return validators
+
+
+def _conditional_headers(meta: Dict[str, str]) -> Dict[str, str]:
+    headers = {}
+    if meta.get("etag"):
+        headers['If-None-Match'] = meta["etag"]
+    if meta.get("last_modified"):
+        headers['If-Modified-Since'] = meta["last_modified"]
+    return headers
+
+
+def scrape_stats() -> Dict[str, float]:
+    """Return how many pages each path served, the rate of escalation to the browser
+    and page cache counters."""
+    attempted_http = _stats["http"] + _stats["escalated"]
+    return {
+        **_stats,
+        "escalation_rate": _stats["escalated"] / attempted_http if attempted_http else 0.0,
+        "learned_js_domains": sum(expires > time.monotonic() for expires in _learned_js_domains.values()),
+        "page_cache": page_cache.stats(),
+    }
+
+
+async def _block_non_document_resources(route: Route) -> None:
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
 webscraper_tool = AsyncWebScraper()
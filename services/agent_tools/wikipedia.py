@@ -1,4 +1,27 @@
+from typing import Optional
+
 from langchain_community.tools import WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+
+from services.agent_tools.result_cache import result_cache
+from services.utils.executors import run_blocking
+
+
+class CachedWikipediaQueryRun(WikipediaQueryRun):
+    """Wikipedia tool answered from the shared result cache when possible."""
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        return result_cache.fetch(
+            self.name, query, self.api_wrapper.top_k_results,
+            lambda: WikipediaQueryRun._run(self, query)
+        )
+
+    async def _arun(self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None) -> str:
+        return await result_cache.afetch(
+            self.name, query, self.api_wrapper.top_k_results,
+            lambda: run_blocking(WikipediaQueryRun._run, self, query)
+        )
+
 
-wikipedia_tool = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+wikipedia_tool = CachedWikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
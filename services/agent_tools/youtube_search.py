@@ -1,13 +1,24 @@
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 from youtube_search import YoutubeSearch
+import asyncio
 import json
+import logging
+
+from services.agent_tools.result_cache import result_cache
+from services.utils.executors import run_blocking
+
+# Seconds a single search may take before it is reported as an error
+SEARCH_TIMEOUT_SECONDS = 15
 
 
 class YouTubeSearchArgs(BaseModel):
     """Arguments for YouTube search."""
-    query: str = Field(..., description="The search query for YouTube videos")
+    query: Union[str, List[str]] = Field(
+        ...,
+        description="The search query for YouTube videos, or a list of queries to run concurrently in one call"
+    )
     max_results: int = Field(default=5, description="Maximum number of results to return")
 
 
@@ -17,9 +28,9 @@ class YouTubeSearchTool(BaseTool):
     description: str = "Search for YouTube videos by query"
     args_schema: type[BaseModel] = YouTubeSearchArgs
     
-    def _run(self, query: str, max_results: int = 5) -> List[dict]:
+    def _search(self, query: str, max_results: int = 5) -> List[dict]:
         """
-        Run YouTube search.
+        Run a single YouTube search.
         
         Args:
             query: Search query
@@ -48,9 +59,31 @@ class YouTubeSearchTool(BaseTool):
         except Exception as e:
             return [{"error": f"Error searching YouTube: {str(e)}"}]
     
-    async def _arun(self, query: str, max_results: int = 5) -> List[dict]:
-        """Async implementation of the tool."""
-        return self._run(query, max_results)
+    def _run(self, query: Union[str, List[str]], max_results: int = 5) -> Union[List[dict], Dict[str, List[dict]]]:
+        """Run YouTube search; a list of queries returns results keyed by query."""
+        if isinstance(query, list):
+            return {q: self._cached_search(q, max_results) for q in query}
+        return self._cached_search(query, max_results)
+
+    def _cached_search(self, query: str, max_results: int) -> List[dict]:
+        return result_cache.fetch(self.name, query, max_results, lambda: self._search(query, max_results))
+
+    async def _asearch(self, query: str, max_results: int) -> List[dict]:
+        try:
+            return await result_cache.afetch(
+                self.name, query, max_results,
+                lambda: run_blocking(self._search, query, max_results, timeout=SEARCH_TIMEOUT_SECONDS)
+            )
+        except asyncio.TimeoutError:
+            logging.error(f"YouTube search timed out: {query}")
+            return [{"error": f"YouTube search timed out after {SEARCH_TIMEOUT_SECONDS}s"}]
+
+    async def _arun(self, query: Union[str, List[str]], max_results: int = 5) -> Union[List[dict], Dict[str, List[dict]]]:
+        """Async implementation of the tool; runs searches on the shared tool pool."""
+        if isinstance(query, list):
+            results = await asyncio.gather(*(self._asearch(q, max_results) for q in query))
+            return dict(zip(query, results))
+        return await self._asearch(query, max_results)
 
 
 # Create tool instance
@@ -1,7 +1,9 @@
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 from typing import List, Union
-from services.youtube.loader import get_transcripts_async
+import asyncio
+from services.utils.executors import run_blocking
+from services.youtube.loader import iter_transcripts
 from services.utils.summarizer import summarize_long_text
 from services.utils.text_splitter import count_tokens, get_model_config
 from services.prompts.text.model_manager import get_current_model
@@ -51,32 +53,37 @@ class AsyncYoutubeTranscriptLoader(BaseTool):
             # Get current model and its configuration
             model_name = get_current_model()
             model_config = get_model_config(model_name)
-            
-            # Get transcripts from YouTube without timestamps for conciseness
-            transcripts = await get_transcripts_async(youtube_video_links, include_timestamps=False)
-            
-            # Process each transcript
-            processed_transcripts = []
-            for transcript in transcripts:
-                if not transcript.startswith("Error:"):
-                    # Check if transcript exceeds model's context window
-                    if count_tokens(transcript, model_name) > model_config["context_window"]:
-                        # Summarize long transcript using o3-mini
-                        summarized = await summarize_long_text(
-                            text=transcript,
-                            target_model=model_name,
-                            summarizer_model="o3-mini"
-                        )
-                        processed_transcripts.append(
-                            f"[Note: This transcript was summarized due to length]\n\n{summarized}"
-                        )
-                    else:
-                        processed_transcripts.append(transcript)
-                else:
+
+            async def process(transcript: str) -> str:
+                if transcript.startswith("Error:"):
                     # Preserve error messages
-                    processed_transcripts.append(transcript)
-            
-            return processed_transcripts
+                    return transcript
+                # Check if transcript exceeds model's context window; counting a long
+                # transcript is CPU-bound, so it runs off the event loop
+                tokens = await run_blocking(count_tokens, transcript, model_name, pool="tool_output")
+                if tokens > model_config["context_window"]:
+                    # Summarize long transcript using o3-mini
+                    summarized = await summarize_long_text(
+                        text=transcript,
+                        target_model=model_name,
+                        summarizer_model="o3-mini"
+                    )
+                    return f"[Note: This transcript was summarized due to length]\n\n{summarized}"
+                return transcript
+
+            # Get transcripts from YouTube without timestamps for conciseness. Each one is
+            # counted (and summarized if needed) as soon as it arrives, while later videos
+            # are still downloading.
+            processing = [None] * len(youtube_video_links)
+            async for index, _, transcript in iter_transcripts(youtube_video_links, include_timestamps=False):
+                processing[index] = asyncio.ensure_future(process(transcript))
+
+            # A video whose processing fails gets its own error entry; the others are kept
+            results = await asyncio.gather(*processing, return_exceptions=True)
+            return [
+                f"Error: {str(result)} for video {url}" if isinstance(result, Exception) else result
+                for url, result in zip(youtube_video_links, results)
+            ]
             
         except Exception as e:
             return [f"Error: {str(e)}"]
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# langchain_core.language_models (with langsmith behind it) and httpx are only needed once
+# the first client is created, so they are imported there rather than at app startup
+if TYPE_CHECKING:
+    import httpx
+    from langchain.agents import AgentExecutor
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import Runnable
+    from langchain_core.tools import BaseTool
+
+load_dotenv()
+
+# Connection limits (httpx.Limits arguments) and timeouts, in seconds, of the HTTP pool
+# shared by all OpenAI models
+HTTP_POOL_LIMITS = {"max_connections": 50, "max_keepalive_connections": 20, "keepalive_expiry": 60}
+HTTP_TIMEOUT_SECONDS = 600.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 10.0
+
+
+class LLMRegistry:
+    """Process-wide registry of chat model clients and compiled agent executors.
+
+    Chat models are created once per model name and keep their HTTP connection pools
+    (and TLS sessions) alive across turns; all OpenAI models share one pool. Agent
+    executors are compiled once per (model, prompt, toolset), and plain prompt | model
+    chains once per (model, prompt), and reused until one of those changes. The async clients are bound to the background event loop, so
+    executors from this registry must be invoked there (see LLMResponseGenerator).
+    """
+
+    def __init__(self, max_executors: int = 16):
+        self.max_executors = max_executors
+        self._models: Dict[str, "BaseChatModel"] = {}
+        self._executors: "OrderedDict[Tuple[str, str, Optional[Tuple]], Runnable]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._http_client: Optional["httpx.Client"] = None
+        self._http_async_client: Optional["httpx.AsyncClient"] = None
+
+    def chat_model(self, model_name: str) -> "BaseChatModel":
+        """Return the shared chat model client for `model_name`, creating it on first use."""
+        with self._lock:
+            llm = self._models.get(model_name)
+            if llm is None:
+                llm = self._create_chat_model(model_name)
+                self._models[model_name] = llm
+            return llm
+
+    def register_chat_model(self, model_name: str, llm: "BaseChatModel") -> None:
+        """Use a preconfigured chat model for `model_name` (e.g. a fake model in benchmarks)."""
+        with self._lock:
+            self._models[model_name] = llm
+            self._drop_executors(model_name)
+
+    def executor(self, model_name: str, prompt: "ChatPromptTemplate", tools: List["BaseTool"]) -> "AgentExecutor":
+        """Return a compiled agent executor for this model, prompt and toolset."""
+        key = (model_name, prompt_fingerprint(prompt), tuple((tool.name, id(tool)) for tool in tools))
+        with self._lock:
+            runnable = self._executors.get(key)
+            if runnable is not None:
+                self._executors.move_to_end(key)
+                return runnable
+
+            # langchain.agents alone takes about a second to import; load it on the first turn
+            from langchain.agents import create_tool_calling_agent, AgentExecutor
+            agent = create_tool_calling_agent(
+                llm=self.chat_model(model_name),
+                tools=tools,
+                prompt=prompt,
+            )
+            runnable = AgentExecutor.from_agent_and_tools(
+                agent=agent,
+                tools=tools,
+                verbose=True
+            )
+            self._executors[key] = runnable
+            while len(self._executors) > self.max_executors:
+                self._executors.popitem(last=False)
+            return runnable
+
+    def chat_chain(self, model_name: str, prompt: "ChatPromptTemplate") -> "Runnable":
+        """Return a `prompt | model` chain for turns that bind no tools.
+
+        Like an executor it takes the prompt variables and returns {"output": ...}, so
+        callers can run either one.
+        """
+        key = (model_name, prompt_fingerprint(prompt), None)
+        with self._lock:
+            runnable = self._executors.get(key)
+            if runnable is not None:
+                self._executors.move_to_end(key)
+                return runnable
+            from langchain_core.runnables import RunnableLambda
+            runnable = (prompt | self.chat_model(model_name)
+                        | RunnableLambda(lambda message: {"output": message.content}, name="chat_output"))
+            self._executors[key] = runnable
+            while len(self._executors) > self.max_executors:
+                self._executors.popitem(last=False)
+            return runnable
+
+    def warm_up(self, model_names: Iterable[str]) -> None:
+        """Create clients ahead of the first request, e.g. once at app startup."""
+        for model_name in model_names:
+            self.chat_model(model_name)
+
+    def invalidate(self, model_name: Optional[str] = None) -> None:
+        """Drop cached clients and executors for one model, or for all models."""
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+                self._executors.clear()
+            else:
+                self._models.pop(model_name, None)
+                self._drop_executors(model_name)
+
+    def _drop_executors(self, model_name: str) -> None:
+        for key in [key for key in self._executors if key[0] == model_name]:
+            del self._executors[key]
+
+    def _create_chat_model(self, model_name: str) -> "BaseChatModel":
+        # Provider SDKs are imported when their first client is created, not at app startup
+        if "claude" in model_name:
+            from langchain_anthropic import ChatAnthropic
+            # ChatAnthropic keeps its own client (and connection pool) per instance
+            return ChatAnthropic(
+                model_name=model_name,
+                api_key=os.getenv("ANTHROPIC_API_KEY")
+            )
+        if self._http_async_client is None:
+            import httpx
+            limits = httpx.Limits(**HTTP_POOL_LIMITS)
+            timeout = httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+            self._http_client = httpx.Client(limits=limits, timeout=timeout)
+            self._http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(
+            model_name=model_name,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=self._http_client,
+            http_async_client=self._http_async_client,
+        )
+
+
+def prompt_fingerprint(prompt: "ChatPromptTemplate") -> str:
+    """Identify a prompt by its content, so an edited prompt compiles a new executor."""
+    return hashlib.sha1(repr(prompt.messages).encode("utf-8")).hexdigest()
+
+
+llm_registry = LLMRegistry()
@@ -1,6 +1,15 @@
-from .agent import prompt as agent_prompt
+from .agent import create_chat_prompt, without_tools
+
+
+def __getattr__(name: str):
+    # Resolved on access, so importing the package does not read the prompt file
+    if name == "agent_prompt":
+        return create_chat_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
     "agent_prompt",
+    "create_chat_prompt",
+    "without_tools",
 ]
@@ -1,13 +1,21 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, HumanMessagePromptTemplate
 from langchain_core.messages import SystemMessage
-from services.prompts.text.prompt_manager import load_prompt, get_current_prompt
+from services.prompts.text import prompt_manager
+from services.prompts.text.prompt_manager import get_current_prompt, load_prompt
 from .tools import tool_prompt
 
-def create_chat_prompt() -> ChatPromptTemplate:
-    # Get the current prompt content or use default tool prompt
-    current_prompt_name = get_current_prompt()
-    system_content = load_prompt(current_prompt_name)
+# A cached template re-checks its file's mtime at most this often; edits made through
+# prompt_manager invalidate it immediately
+PROMPT_STAT_INTERVAL_SECONDS = 2.0
+
 
+def build_chat_prompt(system_content: Optional[str]) -> ChatPromptTemplate:
     system_message = SystemMessage(content=system_content)
     tool_system_message = SystemMessage(content=tool_prompt)
     chat_history_placeholder = MessagesPlaceholder(variable_name="chat_history")
@@ -22,5 +30,94 @@ def create_chat_prompt() -> ChatPromptTemplate:
         agent_scratchpad,
     ])
 
-# Initialize default prompt
-prompt = create_chat_prompt()
+
+_without_tools: "OrderedDict[int, Tuple[ChatPromptTemplate, ChatPromptTemplate]]" = OrderedDict()
+_without_tools_lock = threading.Lock()
+
+
+def without_tools(prompt: ChatPromptTemplate) -> ChatPromptTemplate:
+    """Return `prompt` without the tool instructions and the agent scratchpad, for turns
+    answered by the model alone. The result is memoized per prompt object."""
+    with _without_tools_lock:
+        entry = _without_tools.get(id(prompt))
+        if entry is not None and entry[0] is prompt:
+            _without_tools.move_to_end(id(prompt))
+            return entry[1]
+    stripped = ChatPromptTemplate.from_messages([
+        message for message in prompt.messages
+        if not (isinstance(message, SystemMessage) and message.content == tool_prompt)
+        and not (isinstance(message, MessagesPlaceholder) and message.variable_name == "agent_scratchpad")
+    ])
+    with _without_tools_lock:
+        _without_tools[id(prompt)] = (prompt, stripped)
+        while len(_without_tools) > 16:
+            _without_tools.popitem(last=False)
+    return stripped
+
+
+class PromptTemplateCache:
+    """Compiled chat prompt templates keyed by prompt name and file mtime.
+
+    A template is built on first use and returned as is while its file is unchanged, so
+    the registry's compiled executor for it is reused too. The file is stat'ed at most
+    every `stat_interval` seconds per prompt (to pick up edits from other processes),
+    and saves or deletes through prompt_manager drop the entry right away.
+    """
+
+    def __init__(self, stat_interval: float = PROMPT_STAT_INTERVAL_SECONDS):
+        self.stat_interval = stat_interval
+        # name -> (file signature, template, monotonic time of the last stat)
+        self._entries: Dict[Optional[str], Tuple[Optional[Tuple[int, int]], ChatPromptTemplate, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: Optional[str]) -> ChatPromptTemplate:
+        """Return the compiled template for prompt `name`, building it only if its file changed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and now - entry[2] < self.stat_interval:
+                return entry[1]
+        signature = _signature(name)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == signature:
+                self._entries[name] = (signature, entry[1], now)
+                return entry[1]
+        template = build_chat_prompt(load_prompt(name))
+        with self._lock:
+            self._entries[name] = (signature, template, now)
+        return template
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop the cached template of prompt `name`, or all of them."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+
+def _signature(name: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not name:
+        return None
+    try:
+        stat = os.stat(os.path.join(prompt_manager.PROMPTS_DIR, f"{name}.txt"))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+prompt_cache = PromptTemplateCache()
+prompt_manager.on_prompt_change(prompt_cache.invalidate)
+
+
+def create_chat_prompt() -> ChatPromptTemplate:
+    """Return the chat prompt for the current prompt selection (compiled once per file version)."""
+    return prompt_cache.get(get_current_prompt())
+
+
+def __getattr__(name: str):
+    # `prompt` used to be built at import time; it now resolves on access
+    if name == "prompt":
+        return create_chat_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,135 @@
+import contextvars
+import copy
+import json
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, MutableMapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+
+# Selections (current model, current prompt) made in the active user session
+_session_selection: contextvars.ContextVar[Optional[MutableMapping[str, Any]]] = contextvars.ContextVar(
+    "session_selection", default=None
+)
+
+
+class ConfigStore:
+    """In-memory view of config.json shared by the model and prompt managers.
+
+    Reads return the parsed config and only re-read the file when its mtime or size
+    changes. Writes hold an exclusive file lock across read-modify-write and replace
+    the file atomically (temp file plus rename), so concurrent worker processes
+    cannot corrupt it.
+    """
+
+    def __init__(self, path: str = CONFIG_FILE):
+        self.path = path
+        self._lock_path = path + '.lock'
+        self._config: Dict[str, Any] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def read(self) -> Dict[str, Any]:
+        """Return a copy of the current config ({} if the file does not exist)."""
+        with self._lock:
+            self._revalidate()
+            return copy.deepcopy(self._config)
+
+    def update(self, mutate: Callable[[Dict[str, Any]], None]) -> None:
+        """Apply `mutate` to the config and persist it atomically under a file lock."""
+        with self._lock, _file_lock(self._lock_path):
+            # Always start from the file on disk, another process may have written it
+            self._signature = None
+            self._revalidate()
+            config = copy.deepcopy(self._config)
+            mutate(config)
+            self._write(config)
+            self._config = config
+            self._signature = self._stat()
+
+    def _revalidate(self) -> None:
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        if signature is None:
+            self._config = {}
+        else:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._config = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError) as e:
+                # Keep serving the last good config
+                logger.error(f"Error reading config: {e}")
+                return
+        self._signature = signature
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _write(self, config: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on `path` for the duration of the block."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def bind_session(selection: MutableMapping[str, Any]) -> None:
+    """Route model/prompt selection for the current context to a per-session mapping.
+
+    Pass a dict stored in the user's session state (e.g. Streamlit's
+    `st.session_state`). Until a session selects something, the global
+    config.json values are used as defaults.
+    """
+    _session_selection.set(selection)
+
+
+def session_selection() -> Optional[MutableMapping[str, Any]]:
+    """Return the selection mapping bound to the current context, if any."""
+    return _session_selection.get()
+
+
+config_store = ConfigStore()
@@ -1,45 +1,32 @@
-import os
-import json
-from typing import List, Optional
+from typing import List
 
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+from services.prompts.text.config_store import CONFIG_FILE, config_store, session_selection
+
+DEFAULT_MODEL = "gpt-4o"
 
 
 def get_available_models() -> List[str]:
     """Returns list of available models"""
-    if not os.path.exists(CONFIG_FILE):
-        return []
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config.get('model_config', {}).get('available_models', [])
-    except (json.JSONDecodeError, FileNotFoundError):
-        return []
+    return config_store.read().get('model_config', {}).get('available_models', [])
 
 
 def get_current_model() -> str:
-    """Returns currently selected model from config"""
-    if not os.path.exists(CONFIG_FILE):
-        return "gpt-4o"
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config.get('model_config', {}).get('current_model', "gpt-4o")
-    except (json.JSONDecodeError, FileNotFoundError):
-        return "gpt-4o"
-
-
-def set_current_model(model_name: str) -> None:
-    """Sets current model in config"""
-    try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-        else:
-            config = {}
-
+    """Returns the model selected in the current session, or the default from config"""
+    selection = session_selection()
+    if selection is not None and selection.get('current_model'):
+        return selection['current_model']
+    return config_store.read().get('model_config', {}).get('current_model', DEFAULT_MODEL)
+
+
+def set_current_model(model_name: str, global_default: bool = False) -> None:
+    """Sets current model for the current session, or in config when no session is bound
+    (or when `global_default` is True)"""
+    selection = session_selection()
+    if selection is not None and not global_default:
+        selection['current_model'] = model_name
+        return
+
+    def update(config: dict) -> None:
         if 'model_config' not in config:
             config['model_config'] = {
                 'available_models': ["gpt-4o", "gpt-4o-mini", "o1", "o1-mini", "o3-mini"],
@@ -48,7 +35,7 @@ def set_current_model(model_name: str) -> None:
         else:
             config['model_config']['current_model'] = model_name
 
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
+    try:
+        config_store.update(update)
+    except OSError as e:
         print(f"Error updating model config: {e}")
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 from services.prompts.text import prompt_manager
+from services.prompts.text.config_store import bind_session
 
 
 def load_file_directly(file_path):
@@ -14,6 +15,7 @@ def load_file_directly(file_path):
 
 
 def main():
+    bind_session(st.session_state.setdefault("config_selection", {}))
     st.title("Agent Prompt Editor")
 
     # Debug information at the top level
@@ -89,9 +91,7 @@ def main():
             if not prompt_name:
                 st.error("Please enter a prompt name")
             else:
-                with open(os.path.join(os.path.dirname(__file__), 'prompts', f"{prompt_name}.txt"), 'w',
-                          encoding='utf-8') as f:
-                    f.write(prompt_content)
+                prompt_manager.save_prompt(prompt_name, prompt_content)
                 if prompt_name != current_prompt:
                     prompt_manager.set_current_prompt(prompt_name)
                 st.success(f"Saved prompt: {prompt_name}")
@@ -1,15 +1,30 @@
 import os
-import json
-from typing import List, Optional
+from typing import Callable, List, Optional
 
+from services.prompts.text.config_store import CONFIG_FILE, config_store, session_selection
 
 # Constants
 PROMPTS_DIR = os.path.join(os.path.dirname(__file__), 'prompts')
-CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
 
 # Ensure prompts directory exists
 os.makedirs(PROMPTS_DIR, exist_ok=True)
 
+# Called with a prompt's name whenever it is saved or deleted (e.g. to drop a compiled template)
+_change_listeners: List[Callable[[str], None]] = []
+
+
+def on_prompt_change(callback: Callable[[str], None]) -> None:
+    """Register a callback invoked with the prompt name after a prompt is saved or deleted"""
+    _change_listeners.append(callback)
+
+
+def _notify_change(name: str) -> None:
+    for callback in _change_listeners:
+        try:
+            callback(name)
+        except Exception as e:
+            print(f"Error in prompt change callback: {e}")
+
 
 def get_all_prompts() -> List[str]:
     """Returns list of available prompt names (without extension)"""
@@ -25,38 +40,28 @@ def get_all_prompts() -> List[str]:
 
 
 def get_current_prompt() -> Optional[str]:
-    """Returns name of currently selected prompt from config"""
-    if not os.path.exists(CONFIG_FILE):
-        print(f"Config file does not exist: {CONFIG_FILE}")
-        return None
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            current = config.get('current_prompt')
-            return current
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        print(f"Error reading config: {e}")
-        return None
-
-
-def set_current_prompt(name: str) -> None:
-    """Sets current prompt in config"""
-    try:
-        # Read existing config
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-        else:
-            config = {}
-        
+    """Returns name of the prompt selected in the current session, or the default from config"""
+    selection = session_selection()
+    if selection is not None and 'current_prompt' in selection:
+        return selection['current_prompt']
+    return config_store.read().get('current_prompt')
+
+
+def set_current_prompt(name: str, global_default: bool = False) -> None:
+    """Sets current prompt for the current session, or in config when no session is bound
+    (or when `global_default` is True)"""
+    selection = session_selection()
+    if selection is not None and not global_default:
+        selection['current_prompt'] = name
+        return
+
+    def update(config: dict) -> None:
         # Update only the current_prompt field
         config['current_prompt'] = name
-        
-        # Write back the entire config
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
-    except (json.JSONDecodeError, FileNotFoundError) as e:
+
+    try:
+        config_store.update(update)
+    except OSError as e:
         print(f"Error updating prompt config: {e}")
 
 
@@ -87,6 +92,7 @@ def save_prompt(name: str, content: str) -> None:
     file_path = os.path.join(PROMPTS_DIR, f"{name}.txt")
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(content)
+    _notify_change(name)
 
 
 def delete_prompt(name: str) -> bool:
@@ -95,11 +101,13 @@ def delete_prompt(name: str) -> bool:
     print(f"Deleting prompt: {file_path}")
     try:
         os.remove(file_path)
+        _notify_change(name)
 
-        # If this was the current prompt, clear the setting
-        current = get_current_prompt()
-        if current == name:
+        # If this was the current prompt (for this session or by default), clear the setting
+        if get_current_prompt() == name:
             set_current_prompt("")
+        if config_store.read().get('current_prompt') == name:
+            set_current_prompt("", global_default=True)
         return True
     except FileNotFoundError:
         print(f"File not found when trying to delete: {file_path}")
@@ -1,110 +1,221 @@
-from typing import List, Optional
+import logging
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
-from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
 from langchain_core.tools import BaseTool
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-import os
-from dotenv import load_dotenv
 
-from services.agent_tools import toolkit
-from services.utils.text_splitter import ensure_context_length, get_model_config
+from services.agent_tools import get_toolkit
+from services.agent_tools.output_budget import start_turn, with_output_budget
+from services.agent_tools.tool_router import ToolRoute, route_tools
+from services.llm_registry import llm_registry
+from services.tracing import TracingCallbackHandler, span
+from services.utils.background_loop import background_loop
+from services.utils.conversation_history import ConversationHistory, as_history
+from services.utils.history_compactor import summary_messages
+from services.utils.passage_index import bind_passage_index
+from services.utils.text_splitter import count_tokens, get_model_config
 
-from services.prompts import agent_prompt
+from services.prompts import create_chat_prompt, without_tools
 
-load_dotenv()
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+logger = logging.getLogger(__name__)
+
+NO_RESPONSE = "I apologize, but I was unable to generate a response."
+CONTEXT_LENGTH_APOLOGY = (
+    "I apologize, but the conversation has become too long for me to process. "
+    "Please try starting a new conversation or breaking your request into smaller parts."
+)
 
 
 class LLMResponseGenerator:
     def __init__(self, model_name="gpt-4o", tools: Optional[List[BaseTool]] = None):
-        if tools is None:
-            self.tools = toolkit
-        else:
-            self.tools = toolkit + tools
+        self.extra_tools = list(tools or [])
+        self._tools: Optional[List[BaseTool]] = None
         self.model_name = model_name
         self.model_config = get_model_config(model_name)
 
-    def _parse_chat_history(self, chat_history) -> List[dict]:
-        """Convert chat history to a format suitable for token counting."""
-        parsed_history = []
-        for message in chat_history:
-            if isinstance(message, (AIMessage, HumanMessage)):
-                role = "assistant" if isinstance(message, AIMessage) else "user"
-                parsed_history.append({
-                    "role": role,
-                    "content": message.content
-                })
-        return parsed_history
+    @property
+    def tools(self) -> List[BaseTool]:
+        """The toolkit plus extra tools, loaded on the first turn rather than at startup."""
+        if self._tools is None:
+            # Tool results are trimmed to the turn's token budget before they reach the scratchpad
+            self._tools = with_output_budget(get_toolkit() + self.extra_tools)
+        return self._tools
 
-    async def generate_response(self, user_query: str, prompt: ChatPromptTemplate,
-                              chat_history: List[AIMessage | HumanMessage]) -> str:
-        """Generate a response while ensuring context fits within model's token limits."""
-        
-        # Convert chat history to countable format
-        parsed_history = self._parse_chat_history(chat_history)
-        
-        # Add current query to history for token counting
-        current_context = parsed_history + [{"role": "user", "content": user_query}]
-        
-        # Ensure context fits within model limits
-        truncated_context = ensure_context_length(current_context, self.model_name)
-        
-        # If context was truncated, add a note about it
-        context_truncated = len(truncated_context) < len(current_context)
+    def _prepare(self, user_query: str, prompt: ChatPromptTemplate,
+                 chat_history: Union[ConversationHistory, List[AIMessage | HumanMessage]]
+                 ) -> Tuple[Union["AgentExecutor", Runnable], dict, ToolRoute]:
+        """Fit the history into the context window, pick the turn's tools and return the
+        runnable, its input and the tool route."""
+        history = as_history(chat_history, self.model_name)
+        # Pages and transcripts loaded this turn are indexed into the conversation's passage index
+        bind_passage_index(history.passage_index)
+
+        # Older turns folded into the running summary are sent as the summary only;
+        # keep the most recent unsummarized messages that fit next to the current query.
+        # One snapshot of the summary, which the background compactor may replace meanwhile
+        summary = history.summary_state
+        budget = self.model_config["context_window"] - count_tokens(user_query, self.model_name) - summary.tokens
+        start = max(history.fit_start(budget), summary.count)
+        context_truncated = start > summary.count
+        agent_input = user_query
         if context_truncated:
-            user_query = (
+            agent_input = (
                 "Note: Some earlier conversation history has been truncated to fit within "
                 "model's context window.\n\n" + user_query
             )
-        
-        # Initialize LLM with appropriate parameters
-        if "claude" in self.model_name:
-            llm = ChatAnthropic(
-                model_name=self.model_name,
-                api_key=os.getenv("ANTHROPIC_API_KEY")
-            )
-        else:
-            llm = ChatOpenAI(
-                model_name=self.model_name,
-                api_key=os.getenv("OPENAI_API_KEY")
-            )
 
         # Prepare input for the agent
         input_dict = {
             "agent_scratchpad": "",
-            "chat_history": chat_history[-len(truncated_context)+1:] if context_truncated else chat_history,
-            "input": user_query,
+            "chat_history": summary_messages(summary) + history.messages[start:],
+            "input": agent_input,
         }
 
-        # Create and run the agent
-        agent = create_tool_calling_agent(
-            llm=llm,
-            tools=self.tools,
-            prompt=prompt,
-        )
-
-        runnable = AgentExecutor.from_agent_and_tools(
-            agent=agent,
-            tools=self.tools,
-            verbose=True
-        )
-
-        try:
-            response = await runnable.ainvoke(input_dict)
-            if "claude" in self.model_name:
-                return response.get("output", {})[0].get("text", "I apologize, but I was unable to generate a response.")
-            return response.get("output", "I apologize, but I was unable to generate a response.")
-        except Exception as e:
-            error_msg = str(e)
-            if "maximum context length" in error_msg.lower():
-                return (
-                    "I apologize, but the conversation has become too long for me to process. "
-                    "Please try starting a new conversation or breaking your request into smaller parts."
+        # Bind only the tools this query needs; with none, the model answers without
+        # the tool schemas, the tool prompt or the agent loop. Routed on the user's own
+        # words, not the truncation note
+        route = route_tools(user_query, self.tools, self.model_name, len(history.passage_index) > 0)
+        if not route.tools:
+            return llm_registry.chat_chain(self.model_name, without_tools(prompt)), input_dict, route
+
+        # Reuse the compiled executor (and its HTTP connection pool) across turns
+        return llm_registry.executor(self.model_name, prompt, route.tools), input_dict, route
+
+    async def generate_response(self, user_query: str, prompt: ChatPromptTemplate,
+                              chat_history: Union[ConversationHistory, List[AIMessage | HumanMessage]]) -> str:
+        """Generate a response while ensuring context fits within model's token limits.
+
+        Passing a ConversationHistory lets the per-message token counts be reused
+        across turns; a plain message list is counted on the fly.
+        """
+        runnable, input_dict, route = self._prepare(user_query, prompt, chat_history)
+        budget = start_turn(self.model_name)
+
+        with span("generate_response", "agent", model=self.model_name, tools_bound=len(route.tools),
+                  schema_tokens_saved_per_call=route.saved_tokens) as turn:
+            try:
+                # Registry clients are bound to the long-lived background loop
+                response = await background_loop.run(
+                    runnable.ainvoke(input_dict, config={"callbacks": [TracingCallbackHandler()]})
                 )
-            raise  # Re-raise other exceptions to be handled by the main error handler
+                return _output_text(response.get("output"))
+            except Exception as e:
+                if _is_context_length_error(e):
+                    return CONTEXT_LENGTH_APOLOGY
+                raise  # Re-raise other exceptions to be handled by the main error handler
+            finally:
+                turn.set(tool_tokens=budget.report())
+                logger.info(f"Tool output tokens for {self.model_name}: {budget.report()}")
+
+    async def stream_response(self, user_query: str, prompt: ChatPromptTemplate,
+                              chat_history: Union[ConversationHistory, List[AIMessage | HumanMessage]]
+                              ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response as events while the agent is running.
+
+        Yields dicts with a "type" key:
+            - "tool_start": {"name", "input"} when the agent calls a tool
+            - "tool_end": {"name", "output"} when the tool returns
+            - "token": {"text"} for each answer token as it arrives
+            - "end": {"output", "metrics"} once, with the final answer and the turn's
+              latency metrics ("ttft" and "total" in seconds, and "tool_calls") and
+              "tool_tokens", the tokens each tool produced and how many were kept,
+              "trace_id", the id of the turn's trace, "tools_bound", the names of the
+              tools the router bound, "llm_calls" and "schema_tokens_saved", the tool
+              schema and tool prompt tokens not sent over all of the turn's model calls
+        """
+        runnable, input_dict, route = self._prepare(user_query, prompt, chat_history)
+        events = background_loop.iterate(self._agent_events(runnable, input_dict, route))
+        async for event in events:
+            yield event
+
+    async def _agent_events(self, runnable: Union["AgentExecutor", Runnable], input_dict: dict,
+                            route: ToolRoute) -> AsyncIterator[Dict[str, Any]]:
+        budget = start_turn(self.model_name)
+        started = time.perf_counter()
+        first_token_at = None
+        tool_calls = 0
+        llm_calls = 0
+        streamed: List[str] = []
+        output = None
+        root_run_id = None
+
+        with span("stream_response", "agent", model=self.model_name) as turn:
+            try:
+                async for event in runnable.astream_events(
+                    input_dict, config={"callbacks": [TracingCallbackHandler()]}, version="v2"
+                ):
+                    kind = event["event"]
+                    if root_run_id is None:
+                        root_run_id = event["run_id"]
+
+                    if kind == "on_chat_model_start":
+                        llm_calls += 1
+                    elif kind == "on_chat_model_stream":
+                        text = _chunk_text(event["data"]["chunk"].content)
+                        if text:
+                            if first_token_at is None:
+                                first_token_at = time.perf_counter()
+                            streamed.append(text)
+                            yield {"type": "token", "text": text}
+                    elif kind == "on_tool_start":
+                        tool_calls += 1
+                        # Text streamed before a tool call was the agent planning, not the answer
+                        streamed.clear()
+                        yield {"type": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+                    elif kind == "on_tool_end":
+                        yield {"type": "tool_end", "name": event["name"], "output": event["data"].get("output")}
+                    elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+                        output = _output_text(event["data"].get("output", {}).get("output"))
+            except Exception as e:
+                if not _is_context_length_error(e):
+                    raise
+                output = CONTEXT_LENGTH_APOLOGY
+
+            finished = time.perf_counter()
+            metrics = {
+                "ttft": (first_token_at - started) if first_token_at is not None else None,
+                "total": finished - started,
+                "tool_calls": tool_calls,
+                "tool_tokens": budget.report(),
+                "trace_id": turn.trace_id,
+                "tools_bound": [tool.name for tool in route.tools],
+                "llm_calls": llm_calls,
+                # The tool schemas are re-sent with every reasoning step of the agent
+                "schema_tokens_saved": route.saved_tokens * llm_calls,
+            }
+            turn.set(ttft=metrics["ttft"], tool_calls=tool_calls, tool_tokens=metrics["tool_tokens"],
+                     tools_bound=len(route.tools), schema_tokens_saved=metrics["schema_tokens_saved"])
+        logger.info(f"Turn latency for {self.model_name}: {metrics}")
+        yield {"type": "end", "output": output if output is not None else "".join(streamed), "metrics": metrics}
+
+
+def _output_text(output: Any) -> str:
+    """Extract the answer text from agent output (Claude returns a list of content blocks)."""
+    if isinstance(output, list):
+        text = _chunk_text(output)
+        return text or NO_RESPONSE
+    return output or NO_RESPONSE
+
+
+def _chunk_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") == "text"
+    )
+
+
+def _is_context_length_error(error: Exception) -> bool:
+    return "maximum context length" in str(error).lower()
 
 
 async def generate_response(user_query: str, chat_history: List[AIMessage | HumanMessage]) -> str:
-    return await LLMResponseGenerator().generate_response(user_query, chat_history=chat_history, prompt=agent_prompt)
+    return await LLMResponseGenerator().generate_response(user_query, chat_history=chat_history,
+                                                      prompt=create_chat_prompt())
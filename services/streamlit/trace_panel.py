@@ -0,0 +1,76 @@
+import html
+import os
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+from services.tracing import Span, tracer
+
+# Bar colour per span kind
+KIND_COLORS = {
+    "agent": "#6c757d",
+    "llm": "#4c78a8",
+    "tool": "#f58518",
+    "transcripts": "#54a24b",
+    "summarize": "#b279a2",
+}
+DEFAULT_COLOR = "#9d9d9d"
+# Attributes shown next to a span's name
+SHOWN_ATTRIBUTES = ("model", "input_tokens", "output_tokens", "tokens_produced", "tokens_kept", "video_id", "cached",
+                    "tools_bound")
+
+
+def debug_enabled() -> bool:
+    """The panel is shown with CONTENT_COPILOT_DEBUG=1 or the `?debug=1` query parameter."""
+    return os.getenv("CONTENT_COPILOT_DEBUG") == "1" or st.query_params.get("debug") == "1"
+
+
+def render_trace_panel(trace_id: Optional[str]) -> None:
+    """Render the spans of a trace as a waterfall inside an expander."""
+    spans = tracer.trace(trace_id) if trace_id else []
+    if not spans:
+        return
+
+    trace_start = min(span.start for span in spans)
+    trace_end = max(span.end or span.start for span in spans)
+    total = max(trace_end - trace_start, 1e-6)
+    depths = _depths(spans)
+
+    rows = []
+    for span in spans:
+        end = span.end if span.end is not None else trace_end
+        left = 100 * (span.start - trace_start) / total
+        width = max(100 * (end - span.start) / total, 0.3)
+        details = ", ".join(
+            f"{key}={span.attributes[key]}" for key in SHOWN_ATTRIBUTES if span.attributes.get(key) not in (None, "")
+        )
+        label = html.escape(span.name) + (f" <small>({html.escape(details)})</small>" if details else "")
+        if span.error:
+            label += f" <small style='color:#d62728'>{html.escape(span.error)}</small>"
+        color = KIND_COLORS.get(span.kind, DEFAULT_COLOR)
+        rows.append(
+            "<div style='display:flex;align-items:center;font-size:12px;margin:2px 0'>"
+            f"<div style='width:40%;padding-left:{12 * depths[span.span_id]}px;white-space:nowrap;"
+            f"overflow:hidden;text-overflow:ellipsis'>{label}</div>"
+            "<div style='width:50%;position:relative;height:14px;background:#f1f3f5'>"
+            f"<div style='position:absolute;left:{left:.2f}%;width:{width:.2f}%;height:100%;"
+            f"background:{color}'></div></div>"
+            f"<div style='width:10%;text-align:right'>{1000 * (end - span.start):.0f} ms</div>"
+            "</div>"
+        )
+
+    with st.expander(f"Trace: {total:.2f}s, {len(spans)} spans"):
+        st.markdown("".join(rows), unsafe_allow_html=True)
+        st.caption(f"Trace {trace_id}")
+
+
+def _depths(spans: List[Span]) -> Dict[str, int]:
+    parents: Dict[str, Optional[str]] = {span.span_id: span.parent_id for span in spans}
+    depths: Dict[str, int] = {}
+    for span_id in parents:
+        depth, parent = 0, parents[span_id]
+        while parent is not None and parent in parents:
+            depth += 1
+            parent = parents[parent]
+        depths[span_id] = depth
+    return depths
@@ -0,0 +1,225 @@
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from services.utils.disk_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Finished traces are appended to TRACE_FILE as one JSON object per span; set
+# CONTENT_COPILOT_TRACING=0 to stop exporting (spans are still kept in memory)
+TRACING_ENABLED = os.getenv("CONTENT_COPILOT_TRACING", "1") != "0"
+TRACE_FILE = os.getenv("CONTENT_COPILOT_TRACE_FILE", os.path.join(CACHE_DIR, "traces", "spans.jsonl"))
+# The trace file is rotated to TRACE_FILE + ".1" once it grows past this size
+TRACE_FILE_MAX_BYTES = 50 * 1024 * 1024
+RECENT_TRACES = 50
+
+
+class Span:
+    """A timed operation within a trace, e.g. one LLM call or one tool invocation."""
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end is None else 1000 * (self.end - self.start)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat, OpenTelemetry-style representation of the span."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": int(self.start * 1e9),
+            "end_time_unix_nano": int(self.end * 1e9) if self.end is not None else None,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+class Tracer:
+    """Collects spans per trace, keeps the most recent traces in memory and exports
+    each trace to a JSONL file once its root span ends."""
+
+    def __init__(self, path: str = TRACE_FILE, export: bool = TRACING_ENABLED, max_traces: int = RECENT_TRACES):
+        self.path = path
+        self.export = export
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, name: str, kind: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Start a span under `parent`, or a new trace when there is no parent."""
+        trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        span = Span(name, kind, trace_id, parent.span_id if parent is not None else None, attributes)
+        with self._lock:
+            self._traces.setdefault(trace_id, []).append(span)
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return span
+
+    def finish(self, span: Span, error: Optional[BaseException] = None) -> None:
+        span.end = time.time()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        if span.parent_id is None and self.export:
+            self._export(self.trace(span.trace_id))
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Return the spans of a trace, ordered by start time."""
+        with self._lock:
+            return sorted(self._traces.get(trace_id, []), key=lambda span: span.start)
+
+    def recent(self) -> List[str]:
+        """Return the ids of the traces kept in memory, oldest first."""
+        with self._lock:
+            return list(self._traces)
+
+    def _export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > TRACE_FILE_MAX_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+        except OSError as e:
+            logger.warning(f"Could not export trace: {str(e)}")
+
+
+tracer = Tracer()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost span open in the current context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+    """Record the enclosed block as a span nested under the current span.
+
+    Example:
+        with span("summarize_chunk", "summarize", input_tokens=n) as s:
+            ...
+            s.set(output_tokens=m)
+    """
+    current = tracer.start(name, kind, current_span(), **attributes)
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned async generator)
+            pass
+        tracer.finish(current, error)
+
+
+@contextmanager
+def activate(current: Span) -> Iterator[Span]:
+    """Make an already started span the current one inside the block, without finishing it.
+
+    Useful for spans that outlive the block, e.g. one covering tasks started inside it.
+    """
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the current span, if there is one."""
+    current = current_span()
+    if current is not None:
+        current.set(**attributes)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records every LLM call of a LangChain run as a span with its token usage.
+
+    Spans are parented to the span that is current when the call starts (the agent
+    turn, or a tool or summarizer span).
+    """
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            **kwargs: Any) -> None:
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        current = self._spans.pop(run_id, None)
+        if current is None:
+            return
+        current.set(**_token_usage(response))
+        tracer.finish(current)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        current = self._spans.pop(run_id, None)
+        if current is not None:
+            tracer.finish(current, error)
+
+    def _start(self, serialized: Dict[str, Any], run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        parent = current_span()
+        if parent is None:
+            return
+        metadata = kwargs.get("metadata") or {}
+        model = metadata.get("ls_model_name") or (kwargs.get("invocation_params") or {}).get("model_name", "")
+        name = (serialized or {}).get("name") or "llm"
+        self._spans[run_id] = tracer.start(f"llm {name}", "llm", parent, model=model)
+
+
+def _token_usage(response: LLMResult) -> Dict[str, int]:
+    """Input and output token counts reported by the provider, if any."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)}
+    return {}
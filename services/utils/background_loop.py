@@ -0,0 +1,118 @@
+import asyncio
+import atexit
+import contextvars
+import threading
+from typing import Any, AsyncIterator, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """A long-lived event loop running in a daemon thread.
+
+    Streamlit executes `asyncio.run(main())` on every rerun, so any resource bound
+    to an event loop (browser connections, HTTP connection pools) dies with the
+    rerun. Work that should outlive a single rerun is submitted to this loop instead.
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the background event loop, starting its thread on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self._name, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine) -> "asyncio.Future":
+        """Schedule a coroutine on the background loop from any thread.
+
+        The caller's context variables are copied into the new task.
+
+        Returns:
+            A concurrent.futures.Future resolving to the coroutine result
+        """
+        loop = self.loop
+        context = contextvars.copy_context()
+        return asyncio.run_coroutine_threadsafe(_with_context(coro, context), loop)
+
+    async def run(self, coro: Coroutine) -> Any:
+        """Await a coroutine on the background loop from any other event loop."""
+        if _running_loop() is self._loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    async def iterate(self, agen: AsyncIterator) -> AsyncIterator:
+        """Consume an async iterator on the background loop, yielding its items here.
+
+        The iterator runs to completion inside a single background task (so its context
+        variables behave normally) and hands items back to the caller's loop.
+        """
+        caller_loop = _running_loop()
+        if caller_loop is self._loop:
+            async for item in agen:
+                yield item
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def put(done: bool, value: Any) -> None:
+            caller_loop.call_soon_threadsafe(queue.put_nowait, (done, value))
+
+        async def pump() -> None:
+            try:
+                async for item in agen:
+                    put(False, item)
+            except BaseException as e:
+                put(True, e)
+                raise
+            put(True, None)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                done, value = await queue.get()
+                if done:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            # Stops the producer if the consumer goes away early
+            future.cancel()
+
+    def stop(self) -> None:
+        """Stop the loop and wait for its thread to exit."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+
+
+async def _with_context(coro: Coroutine, context: contextvars.Context) -> Any:
+    """Run `coro` as a task created inside the given context."""
+    task = context.run(asyncio.ensure_future, coro)
+    return await task
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# Process-wide loop shared by long-lived async resources
+background_loop = BackgroundLoop()
+atexit.register(background_loop.stop)
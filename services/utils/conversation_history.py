@@ -0,0 +1,173 @@
+import threading
+from bisect import bisect_left
+from concurrent.futures import Future
+from itertools import accumulate
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from services.utils.passage_index import PassageIndex
+from services.utils.text_splitter import count_tokens, count_tokens_batch
+
+
+class HistorySummary(NamedTuple):
+    """Running summary of a conversation, published as a whole so readers never see a
+    summary paired with another summary's token count or message count."""
+    text: Optional[str] = None
+    tokens: int = 0
+    count: int = 0  # messages[:count] are covered by the summary
+
+
+class ConversationHistory:
+    """Chat history that carries a cached token count for every stored message.
+
+    Each message is counted once, when it is appended, and the history keeps running
+    prefix sums of those counts. Finding how much of the history fits a token budget
+    is then a binary search instead of re-counting the whole conversation every turn.
+    Counts are tied to a model's tokenizer and are recomputed only if the model changes.
+
+    The history also owns the passage index of the pages and transcripts loaded
+    during the conversation, and the running summary that older turns are folded
+    into once the conversation grows (see services.utils.history_compactor).
+    """
+
+    def __init__(self, model_name: str = "gpt-4o", messages: Optional[Iterable[BaseMessage]] = None):
+        self.model_name = model_name
+        self.messages: List[BaseMessage] = []
+        self.token_counts: List[int] = []
+        # _prefix[i] is the number of tokens in messages[:i]
+        self._prefix: List[int] = [0]
+        self.passage_index = PassageIndex(model_name)
+        # Replaced in a single assignment (the background compactor writes it while turns
+        # read it); readers that use several fields should take one snapshot of it
+        self.summary_state = HistorySummary()
+        self._summary_lock = threading.Lock()
+        # Pending background compaction, and a counter that lets it detect a clear() meanwhile
+        self.compaction: Optional[Future] = None
+        self.generation = 0
+        if messages:
+            self.extend(messages)
+
+    def append(self, message: BaseMessage) -> None:
+        """Add a message, counting its tokens once."""
+        self.extend([message])
+
+    def extend(self, messages: Iterable[BaseMessage]) -> None:
+        """Add several messages, counting them in a single batch."""
+        messages = list(messages)
+        counts = count_tokens_batch([_message_text(m) for m in messages], self.model_name)
+        for message, count in zip(messages, counts):
+            self.messages.append(message)
+            self.token_counts.append(count)
+            self._prefix.append(self._prefix[-1] + count)
+
+    def set_model(self, model_name: str) -> None:
+        """Switch tokenizer; cached counts are recomputed only when the model changes."""
+        if model_name == self.model_name:
+            return
+        self.model_name = model_name
+        self.token_counts = count_tokens_batch([_message_text(m) for m in self.messages], model_name)
+        self._prefix = [0] + list(accumulate(self.token_counts))
+        with self._summary_lock:
+            state = self.summary_state
+            if state.text is not None:
+                self.summary_state = state._replace(tokens=count_tokens(state.text, model_name))
+
+    def set_summary(self, summary: str, summarized_count: int, generation: Optional[int] = None) -> bool:
+        """Record that messages[:summarized_count] are now covered by `summary`.
+
+        Args:
+            summary: The updated running summary
+            summarized_count: Number of leading messages the summary covers
+            generation: If given, the summary is dropped when the history was cleared since
+
+        Returns:
+            Whether the summary was stored
+        """
+        with self._summary_lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self.summary_state = HistorySummary(summary, count_tokens(summary, self.model_name), summarized_count)
+            return True
+
+    def clear(self) -> None:
+        self.messages.clear()
+        self.token_counts.clear()
+        self._prefix = [0]
+        self.passage_index.clear()
+        with self._summary_lock:
+            self.summary_state = HistorySummary()
+            self.compaction = None
+            self.generation += 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self._prefix[-1]
+
+    @property
+    def summary(self) -> Optional[str]:
+        return self.summary_state.text
+
+    @property
+    def summary_tokens(self) -> int:
+        return self.summary_state.tokens
+
+    @property
+    def summarized_count(self) -> int:
+        return self.summary_state.count
+
+    @property
+    def unsummarized_tokens(self) -> int:
+        """Tokens in the messages not yet folded into the summary."""
+        return self.total_tokens - self._prefix[self.summarized_count]
+
+    def fit_start(self, budget: int) -> int:
+        """Return the index of the oldest message kept so that the tail fits `budget` tokens.
+
+        Args:
+            budget: Maximum number of tokens the kept messages may use
+
+        Returns:
+            Smallest index i such that messages[i:] fit within the budget
+            (len(self) if not even the last message fits)
+        """
+        # tokens(messages[i:]) = total - prefix[i] <= budget  <=>  prefix[i] >= total - budget
+        return bisect_left(self._prefix, self.total_tokens - budget)
+
+    def window(self, budget: int) -> List[BaseMessage]:
+        """Return the most recent messages that fit within `budget` tokens."""
+        return self.messages[self.fit_start(budget):]
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        return iter(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+
+def _message_text(message: BaseMessage) -> str:
+    """Extract the countable text of a message (content may be a list of blocks)."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(block.get("text", ""))
+    return "".join(parts)
+
+
+def as_history(chat_history: Union[ConversationHistory, List[BaseMessage]], model_name: str) -> ConversationHistory:
+    """Wrap a plain message list in a ConversationHistory (counts come from the token memo)."""
+    if isinstance(chat_history, ConversationHistory):
+        chat_history.set_model(model_name)
+        return chat_history
+    return ConversationHistory(
+        model_name,
+        [m for m in chat_history if isinstance(m, (AIMessage, HumanMessage))]
+    )
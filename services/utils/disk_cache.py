@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, NamedTuple, Optional
+
+# Root directory for all on-disk caches
+CACHE_DIR = os.getenv(
+    "CONTENT_COPILOT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), ".cache")
+)
+
+
+class CacheEntry(NamedTuple):
+    value: bytes
+    meta: Dict[str, Any]
+    created_at: float
+    expires_at: Optional[float]
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.time()
+
+
+class DiskCache:
+    """A size-bounded key/value store backed by SQLite.
+
+    Safe to share between threads and between processes (SQLite handles file
+    locking; WAL mode keeps readers from blocking the writer). Entries may carry a
+    TTL and a small JSON metadata dict. When the total stored size exceeds
+    `max_bytes`, the least recently accessed entries are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, compress: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connect lazily so importing a module that owns a cache never touches disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, raw_size INTEGER NOT NULL, "
+                "meta TEXT, created_at REAL NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for `key` even if it has expired, without touching hit counters."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, meta, created_at, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, meta, created_at, expires_at = row
+        if self.compress:
+            value = zlib.decompress(value)
+        return CacheEntry(value, json.loads(meta) if meta else {}, created_at, expires_at)
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for `key` (even if expired), counting a hit only if it is fresh."""
+        entry = self.get_entry(key)
+        if entry is None or entry.expired:
+            self.misses += 1
+            return entry
+        self.hits += 1
+        self.bytes_saved += len(entry.value)
+        self.touch(key)
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for `key` if present and not expired, counting a hit or miss."""
+        entry = self.lookup(key)
+        if entry is None or entry.expired:
+            return None
+        return entry.value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None,
+            meta: Optional[Dict[str, Any]] = None) -> None:
+        """Store a value, optionally expiring after `ttl` seconds."""
+        now = time.time()
+        stored = zlib.compress(value, 6) if self.compress else value
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, value, size, raw_size, meta, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, stored, len(stored), len(value), json.dumps(meta) if meta else None,
+                 now, now + ttl if ttl is not None else None, now)
+            )
+            self._evict(conn)
+
+    def touch(self, key: str, ttl: Optional[float] = None) -> None:
+        """Mark an entry as recently used, optionally renewing its TTL."""
+        now = time.time()
+        with self._lock:
+            if ttl is None:
+                self._connection().execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            else:
+                self._connection().execute(
+                    "UPDATE entries SET accessed_at = ?, expires_at = ? WHERE key = ?", (now, now + ttl, key)
+                )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM entries")
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: bytes, ttl: Optional[float] = None,
+                   meta: Optional[Dict[str, Any]] = None) -> None:
+        await asyncio.to_thread(self.set, key, value, ttl, meta)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((key,))
+            freed += size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current on-disk footprint."""
+        with self._lock:
+            entries, size, raw_size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "raw_size_bytes": raw_size,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def make_key(*parts: str) -> str:
+    """Build a content-addressed cache key from several string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8", "surrogatepass")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Worker counts of the named pools (thread and process); unknown pool names get DEFAULT_POOL_SIZE workers
+POOL_SIZES = {
+    "tools": int(os.getenv("TOOL_EXECUTOR_WORKERS", "8")),
+    "html_extract": int(os.getenv("HTML_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    "transcripts": int(os.getenv("TRANSCRIPT_WORKERS", "4")),
+    # Budgeting and indexing of tool results, kept off the shared event loop
+    "tool_output": int(os.getenv("TOOL_OUTPUT_WORKERS", str(min(4, os.cpu_count() or 1)))),
+}
+DEFAULT_POOL_SIZE = 4
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_process_pools: Dict[str, ProcessPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Return the shared, bounded thread pool called `name`, creating it on first use."""
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=POOL_SIZES.get(name, DEFAULT_POOL_SIZE),
+                                          thread_name_prefix=f"{name}-pool")
+            _executors[name] = executor
+        return executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, pool: str = "tools",
+                       timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """Run a blocking call on a shared pool without blocking the event loop.
+
+    Args:
+        func: Blocking callable
+        pool: Name of the thread pool to run on
+        timeout: Seconds to wait before raising asyncio.TimeoutError. The worker
+            thread cannot be interrupted, but the pool size bounds how many
+            abandoned calls can pile up.
+
+    Returns:
+        The result of func(*args, **kwargs)
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(pool), functools.partial(func, *args, **kwargs))
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout)
+
+
+def get_process_pool(name: str) -> ProcessPoolExecutor:
+    """Return the shared process pool called `name`, creating it on first use.
+
+    Workers are spawned rather than forked, since the app process runs several threads.
+    """
+    with _lock:
+        pool = _process_pools.get(name)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=POOL_SIZES.get(name, DEFAULT_POOL_SIZE),
+                                       mp_context=multiprocessing.get_context("spawn"))
+            _process_pools[name] = pool
+        return pool
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any, pool: str,
+                         timeout: Optional[float] = None) -> Any:
+    """Run a CPU-bound, picklable top-level function on a shared process pool.
+
+    Raises:
+        asyncio.TimeoutError: If the call takes longer than `timeout` seconds
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_process_pool(pool), functools.partial(func, *args))
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout)
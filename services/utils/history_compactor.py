@@ -0,0 +1,138 @@
+import logging
+import os
+from concurrent.futures import Future
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from services.llm_registry import llm_registry
+from services.tracing import TracingCallbackHandler, span
+from services.utils.background_loop import background_loop
+from services.utils.conversation_history import ConversationHistory, HistorySummary, _message_text
+from services.utils.text_splitter import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Set HISTORY_COMPACTION=0 to drop the oldest messages on overflow instead of summarizing them
+COMPACTION_ENABLED = os.getenv("HISTORY_COMPACTION", "1") != "0"
+# Older turns are folded into the summary once the unsummarized history passes this many tokens
+COMPACTION_TRIGGER_TOKENS = int(os.getenv("HISTORY_COMPACTION_TOKENS", "12000"))
+# The most recent turns that fit this many tokens are always kept verbatim
+KEEP_RECENT_TOKENS = int(os.getenv("HISTORY_KEEP_RECENT_TOKENS", "4000"))
+# Cheap model used to write the running summary
+SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_WORDS = 400
+# A single very long message (e.g. a pasted transcript) is cut to this size before folding
+FOLD_MESSAGE_TOKENS = 2000
+
+COMPACT_PROMPT = """You maintain a running summary of a conversation between a user and an AI content assistant.
+Update the summary so that it also covers the new messages below.
+
+Keep facts, decisions, user preferences, names, numbers, links and open tasks. Drop greetings and small talk.
+Reply with the updated summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n\n"
+
+
+def compaction_cut(history: ConversationHistory, trigger_tokens: int = COMPACTION_TRIGGER_TOKENS,
+                   keep_recent_tokens: int = KEEP_RECENT_TOKENS) -> Optional[int]:
+    """Return the index up to which messages should be folded into the summary.
+
+    The cut lands on a user message, so whole turns are summarized and the recent
+    turns that fit `keep_recent_tokens` stay verbatim.
+
+    Returns:
+        The new summarized_count, or None if the history is still below `trigger_tokens`
+    """
+    if history.unsummarized_tokens <= trigger_tokens:
+        return None
+    summarized_count = history.summarized_count
+    cut = history.fit_start(keep_recent_tokens)
+    messages = history.messages
+    while cut > summarized_count and cut < len(messages) and not isinstance(messages[cut], HumanMessage):
+        cut -= 1
+    return cut if cut > summarized_count else None
+
+
+def summary_messages(summary: HistorySummary) -> List[BaseMessage]:
+    """The running summary (a snapshot of history.summary_state) as messages to place
+    before the unsummarized history."""
+    if not summary.text:
+        return []
+    # A user-role message, since Anthropic only accepts a system message first
+    return [HumanMessage(content=SUMMARY_PREFIX + summary.text)]
+
+
+class HistoryCompactor:
+    """Folds older turns of a conversation into its running summary between turns.
+
+    Compaction runs on the background loop after a turn completes, so it never
+    delays a response; the next turn uses whichever summary is ready by then. The
+    summary is stored on the ConversationHistory itself, which lives in the session.
+    """
+
+    def __init__(self, model_name: str = SUMMARY_MODEL, trigger_tokens: int = COMPACTION_TRIGGER_TOKENS,
+                 keep_recent_tokens: int = KEEP_RECENT_TOKENS):
+        self.model_name = model_name
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.prompt = ChatPromptTemplate.from_template(COMPACT_PROMPT)
+
+    def schedule(self, history: ConversationHistory) -> Optional[Future]:
+        """Start compacting `history` in the background if it has outgrown the threshold.
+
+        Returns:
+            The pending compaction, or None if there is nothing to do
+        """
+        if history.compaction is not None and not history.compaction.done():
+            return history.compaction
+        cut = compaction_cut(history, self.trigger_tokens, self.keep_recent_tokens)
+        if cut is None:
+            return None
+        # Snapshot on the caller's thread; the history may grow while the summary is written
+        state = history.summary_state
+        messages = history.messages[state.count:cut]
+        future = background_loop.submit(
+            self.compact(history, messages, state.text, cut, history.generation)
+        )
+        future.add_done_callback(_log_failure)
+        history.compaction = future
+        return future
+
+    async def compact(self, history: ConversationHistory, messages: List[BaseMessage], summary: Optional[str],
+                      cut: int, generation: int) -> str:
+        """Fold `messages` into `summary` and store the result as covering messages[:cut]."""
+        transcript = "\n\n".join(
+            f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: "
+            f"{truncate_to_tokens(_message_text(m), FOLD_MESSAGE_TOKENS, self.model_name)}"
+            for m in messages
+        )
+        with span("compact_history", "summarize", model=self.model_name, messages=len(messages),
+                  input_tokens=count_tokens(transcript, self.model_name)) as compact_span:
+            response = await llm_registry.chat_model(self.model_name).ainvoke(
+                self.prompt.format_messages(
+                    summary=summary or "(none yet)", messages=transcript, max_words=SUMMARY_MAX_WORDS
+                ),
+                config={"callbacks": [TracingCallbackHandler()]},
+            )
+            updated = _message_text(response).strip()
+            compact_span.set(output_tokens=count_tokens(updated, self.model_name))
+        if updated and history.set_summary(updated, cut, generation):
+            logger.info(f"Folded {len(messages)} messages into the history summary "
+                        f"({history.summary_tokens} tokens)")
+        return updated
+
+
+def _log_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"History compaction failed: {str(future.exception())}")
+
+
+history_compactor = HistoryCompactor()
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30)
+HTTP_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+
+# httpx connection pools are bound to the event loop that created them
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled HTTP client for the running event loop.
+
+    In the app, scraping runs on the long-lived background loop, so a single pool
+    (with its keep-alive connections) is reused across turns.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=HTTP_LIMITS,
+                timeout=HTTP_TIMEOUT,
+                headers={
+                    'User-Agent': USER_AGENT,
+                    'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8',
+                    'Accept-Language': 'en-US,en;q=0.9',
+                },
+            )
+            _clients[loop] = client
+        return client
@@ -0,0 +1,153 @@
+import contextvars
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from services.utils.text_splitter import split_text_into_chunks
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Target size of an indexed passage and how much consecutive passages overlap, in tokens
+PASSAGE_TOKENS = 200
+PASSAGE_OVERLAP_TOKENS = 40
+
+_TERM = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our she so that the "
+    "their them they this to was we were what when which who will with you your".split()
+)
+
+
+class Passage(NamedTuple):
+    text: str
+    source: str
+    position: int
+
+
+def tokenize_terms(text: str) -> List[str]:
+    """Lowercased word terms of a text, without stopwords."""
+    return [term for term in _TERM.findall(text.casefold()) if term not in STOPWORDS]
+
+
+def chunk_passages(text: str, model_name: str = "gpt-4o", passage_tokens: int = PASSAGE_TOKENS,
+                   overlap_tokens: int = PASSAGE_OVERLAP_TOKENS) -> List[str]:
+    """Split a text into passages of at most `passage_tokens` tokens, cut at sentence
+    boundaries where possible and overlapping by up to `overlap_tokens`."""
+    chunks = split_text_into_chunks(text, model_name, chunk_tokens=passage_tokens, chunk_overlap=overlap_tokens)
+    return [chunk.text.strip() for chunk in chunks if chunk.text.strip()]
+
+
+class PassageIndex:
+    """In-memory BM25 index over the passages of pages and transcripts loaded in a conversation.
+
+    Postings are kept per term and turned into NumPy arrays on first use after a change,
+    so a search scores every passage with a few vectorized operations per query term.
+    """
+
+    def __init__(self, model_name: str = "gpt-4o", k1: float = 1.5, b: float = 0.75):
+        self.model_name = model_name
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Passage] = []
+        self._term_ids: Dict[str, int] = {}
+        self._postings: List[Tuple[List[int], List[int]]] = []  # per term: passage ids, term frequencies
+        self._lengths: List[int] = []
+        self._documents: Set[str] = set()
+        self._arrays: Dict[int, Tuple["np.ndarray", "np.ndarray"]] = {}
+        self._length_array: Optional["np.ndarray"] = None
+        self._lock = threading.Lock()
+
+    def add(self, text: str, source: str) -> int:
+        """Index a document's passages; a document already indexed is skipped.
+
+        Returns:
+            Number of passages added
+        """
+        document_hash = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        with self._lock:
+            if document_hash in self._documents:
+                return 0
+            self._documents.add(document_hash)
+        # Chunking and term counting happen outside the lock, which only covers the merge
+        chunks = chunk_passages(text, self.model_name)
+        entries = [(chunk, Counter(tokenize_terms(chunk))) for chunk in chunks]
+        with self._lock:
+            for position, (chunk, frequencies) in enumerate(entries):
+                passage_id = len(self.passages)
+                self.passages.append(Passage(chunk, source, position))
+                for term, frequency in frequencies.items():
+                    term_id = self._term_ids.setdefault(term, len(self._term_ids))
+                    if term_id == len(self._postings):
+                        self._postings.append(([], []))
+                    ids, tfs = self._postings[term_id]
+                    ids.append(passage_id)
+                    tfs.append(frequency)
+                self._lengths.append(sum(frequencies.values()))
+            self._arrays.clear()
+            self._length_array = None
+        return len(chunks)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Passage, float]]:
+        """Return the `k` best passages for a query with their BM25 scores, best first."""
+        # Every conversation owns an index, but NumPy is only needed once something is searched
+        import numpy as np
+        with self._lock:
+            term_ids = {self._term_ids[term] for term in tokenize_terms(query) if term in self._term_ids}
+            if not term_ids or k <= 0:
+                return []
+            if self._length_array is None:
+                self._length_array = np.asarray(self._lengths, dtype=np.float32)
+            lengths = self._length_array
+            count = len(self.passages)
+            norms = self.k1 * (1 - self.b + self.b * lengths / max(float(lengths.mean()), 1.0))
+
+            scores = np.zeros(count, dtype=np.float32)
+            for term_id in term_ids:
+                ids, tfs = self._posting_arrays(term_id)
+                idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + norms[ids])
+
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.passages[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.passages.clear()
+            self._term_ids.clear()
+            self._postings.clear()
+            self._lengths.clear()
+            self._documents.clear()
+            self._arrays.clear()
+            self._length_array = None
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def _posting_arrays(self, term_id: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        import numpy as np
+        arrays = self._arrays.get(term_id)
+        if arrays is None:
+            ids, tfs = self._postings[term_id]
+            arrays = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._arrays[term_id] = arrays
+        return arrays
+
+
+# Passage index of the conversation the current agent turn belongs to
+_current_index: contextvars.ContextVar[Optional[PassageIndex]] = contextvars.ContextVar("passage_index", default=None)
+
+
+def bind_passage_index(index: PassageIndex) -> None:
+    """Make `index` the passage index for tools running in the current context."""
+    _current_index.set(index)
+
+
+def current_passage_index() -> Optional[PassageIndex]:
+    """Return the passage index bound to the current context, if any."""
+    return _current_index.get()
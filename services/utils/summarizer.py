@@ -1,7 +1,16 @@
-from typing import List
-from langchain_openai import ChatOpenAI
+import asyncio
+import hashlib
+import inspect
+import logging
+import os
+from typing import Awaitable, Callable, List, Optional, Union
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
-from services.utils.text_splitter import split_text_by_tokens, count_tokens, get_model_config
+from services.tracing import span
+from services.utils.disk_cache import CACHE_DIR, DiskCache, make_key
+from services.utils.text_splitter import split_text_into_chunks, count_tokens, count_tokens_batch, get_model_config
+
+logger = logging.getLogger(__name__)
 
 SUMMARIZE_PROMPT = """Create a highly detailed summary of the following text. Your summary should be comprehensive and preserve as much specific information as possible while still fitting within the required length.
 
@@ -25,64 +34,272 @@ Guidelines for summarization:
 
 Your summary should be as detailed as possible while remaining coherent and well-organized. Focus on making every word count - avoid general statements in favor of specific, actionable information."""
 
-async def summarize_long_text(text: str, target_model: str = "gpt-4o", summarizer_model: str = "o3-mini") -> str:
+# Changes whenever the prompt text changes, so stale cached summaries are never reused
+SUMMARIZE_PROMPT_VERSION = hashlib.sha256(SUMMARIZE_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+SUMMARY_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Persistent cache of whole-document and per-chunk summaries, shared across sessions
+summary_cache = DiskCache(os.path.join(CACHE_DIR, "summaries.sqlite3"), SUMMARY_CACHE_MAX_BYTES, compress=True)
+
+SECTION_BREAK = "\n\n=== Section Break ===\n\n"
+
+META_SUMMARY_CONTEXT = (
+    "This is a meta-summary combining multiple detailed section summaries. "
+    "Each section represents a distinct part of the original content.\n\n"
+)
+
+# Expected size of a reduce-step summary relative to its input, used to plan the tree
+REDUCE_RATIO = 0.5
+MAX_REDUCE_LEVELS = 8
+RETRY_BACKOFF_SECONDS = 1.0
+
+# Called as on_progress(stage, completed, total) where stage is "map" or "reduce"
+ProgressCallback = Callable[[str, int, int], Union[None, Awaitable[None]]]
+
+
+class SummarizationError(Exception):
+    """Raised when some chunks still fail after all retries.
+
+    Attributes:
+        failed_parts: 1-based indices of the chunks that could not be summarized
+        partial: Summaries of the chunks that succeeded, None for failed ones
+    """
+
+    def __init__(self, failed_parts: List[int], partial: List[Optional[str]], cause: BaseException):
+        super().__init__(f"Failed to summarize parts {failed_parts} after retries: {str(cause)}")
+        self.failed_parts = failed_parts
+        self.partial = partial
+
+
+def plan_reduce_tree(summary_tokens: List[int], group_budget: int, target_budget: int,
+                     max_output_tokens: int) -> List[List[List[int]]]:
+    """Plan the reduce phase from token counts before any reduce call is made.
+
+    Consecutive summaries are grouped greedily so that each group fits the summarizer's
+    input budget; each group's output size is estimated from REDUCE_RATIO. Levels are
+    added until the estimated combined summary fits the target budget.
+
+    Args:
+        summary_tokens: Token count of each map-phase summary, in order
+        group_budget: Maximum input tokens for a single reduce call
+        target_budget: Token budget the final combined summary must fit
+        max_output_tokens: Upper bound on a single summary's size
+
+    Returns:
+        One entry per level, each a list of groups of indices into the previous level
+    """
+    levels = []
+    sizes = list(summary_tokens)
+    while _joined_tokens(sizes) > target_budget and len(levels) < MAX_REDUCE_LEVELS:
+        groups = _group_by_budget(sizes, group_budget)
+        levels.append(groups)
+        sizes = [min(max_output_tokens, int(sum(sizes[i] for i in group) * REDUCE_RATIO) + 1)
+                 for group in groups]
+    return levels
+
+
+def _group_by_budget(sizes: List[int], budget: int) -> List[List[int]]:
+    """Greedily group consecutive items so each group's total fits `budget`."""
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, size in enumerate(sizes):
+        if current and current_tokens + size > budget:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _joined_tokens(sizes: List[int]) -> int:
+    """Approximate token count of summaries joined with section breaks."""
+    return sum(sizes) + 8 * max(len(sizes) - 1, 0)
+
+
+async def _report(on_progress: Optional[ProgressCallback], stage: str, completed: int, total: int) -> None:
+    if on_progress is None:
+        return
+    try:
+        result = on_progress(stage, completed, total)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warning(f"Summarization progress callback failed: {str(e)}")
+
+
+async def _summarize_all(summarize: Callable[[str], Awaitable[str]], inputs: List[str],
+                         max_concurrency: int, max_retries: int,
+                         progress: Callable[[], Awaitable[None]]) -> List[str]:
+    """Summarize all inputs concurrently, retrying only the ones that failed.
+
+    Raises:
+        SummarizationError: If some inputs still fail after `max_retries` retry rounds
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: List[Optional[str]] = [None] * len(inputs)
+
+    async def run_one(i: int) -> str:
+        async with semaphore:
+            summary = await summarize(inputs[i])
+        await progress()
+        return summary
+
+    pending = list(range(len(inputs)))
+    last_error: Optional[BaseException] = None
+    for attempt in range(max_retries + 1):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            logger.warning(f"Retrying {len(pending)} failed summarization chunk(s), attempt {attempt}")
+        outcomes = await asyncio.gather(*(run_one(i) for i in pending), return_exceptions=True)
+        failed = []
+        for i, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                failed.append(i)
+                last_error = outcome
+            else:
+                results[i] = outcome
+        pending = failed
+        if not pending:
+            break
+
+    if pending:
+        raise SummarizationError([i + 1 for i in pending], results, last_error)
+    return results
+
+
+async def summarize_long_text(text: str, target_model: str = "gpt-4o", summarizer_model: str = "o3-mini",
+                              max_concurrency: int = 4, max_retries: int = 2,
+                              on_progress: Optional[ProgressCallback] = None,
+                              cache: Optional[DiskCache] = summary_cache,
+                              summarizer: Optional[BaseChatModel] = None) -> str:
     """
     Summarize text that exceeds the target model's context window.
-    Uses o3-mini for summarization, handling text in chunks if necessary.
+    Uses o3-mini for summarization. Text longer than the summarizer's context window is
+    split into chunks that are summarized concurrently (map), and the chunk summaries are
+    then combined through a reduce tree planned from their token counts.
     
     Args:
         text: Text to summarize
         target_model: Model that will ultimately use the text
         summarizer_model: Model to use for summarization (default: o3-mini)
+        max_concurrency: Maximum number of summarizer calls in flight at once
+        max_retries: Retry rounds for failed chunks; only failed chunks are retried
+        on_progress: Optional callback (sync or async) called as on_progress(stage, completed, total)
+        cache: Summary cache keyed by content hash, models and prompt version; None disables it.
+            Chunk summaries are cached individually, so a failed run resumes where it stopped.
+        summarizer: Chat model to call instead of a ChatOpenAI client for summarizer_model
+            (e.g. a fake model in benchmarks)
     
     Returns:
         Summarized text that fits within target_model's context window
+
+    Raises:
+        SummarizationError: If some chunks still fail after all retries
     """
     target_config = get_model_config(target_model)
     target_max_tokens = target_config["context_window"]
     
     # If text already fits in target model's context, return as is
-    if count_tokens(text, target_model) <= target_max_tokens:
+    input_tokens = count_tokens(text, target_model)
+    if input_tokens <= target_max_tokens:
         return text
-        
+
+    # The span reuses the target-model count instead of tokenizing the whole input again
+    with span("summarize_long_text", "summarize", summarizer_model=summarizer_model,
+              input_tokens=input_tokens) as summary_span:
+        document_key = make_key("document", SUMMARIZE_PROMPT_VERSION, summarizer_model, target_model, text)
+        if cache is not None:
+            cached = await cache.aget(document_key)
+            if cached is not None:
+                summary_span.set(cached=True)
+                return cached.decode("utf-8")
+
+        summary = await _summarize(text, target_model, summarizer_model, max_concurrency, max_retries,
+                                   on_progress, cache, summarizer)
+        if cache is not None:
+            await cache.aset(document_key, summary.encode("utf-8"))
+        summary_span.set(cached=False, output_tokens=count_tokens(summary, summarizer_model))
+        return summary
+
+
+async def _summarize(text: str, target_model: str, summarizer_model: str, max_concurrency: int,
+                     max_retries: int, on_progress: Optional[ProgressCallback],
+                     cache: Optional[DiskCache], summarizer: Optional[BaseChatModel]) -> str:
+    target_max_tokens = get_model_config(target_model)["context_window"]
+    summarizer_config = get_model_config(summarizer_model)
+
     # Initialize summarizer
-    summarizer = ChatOpenAI(
-        model_name=summarizer_model,
-        max_tokens=get_model_config(summarizer_model)["max_output_tokens"],
-        temperature=0.3  # Lower temperature for more precise summaries
-    )
+    if summarizer is None:
+        from langchain_openai import ChatOpenAI
+        summarizer = ChatOpenAI(
+            model_name=summarizer_model,
+            max_tokens=summarizer_config["max_output_tokens"],
+            temperature=0.3  # Lower temperature for more precise summaries
+        )
     
     # Create prompt template
     prompt = ChatPromptTemplate.from_template(SUMMARIZE_PROMPT)
-    
-    # If text is too long for summarizer, split and summarize chunks
-    if count_tokens(text, summarizer_model) > get_model_config(summarizer_model)["context_window"]:
-        chunks = split_text_by_tokens(text, summarizer_model)
-        summaries = []
-        
-        for i, chunk in enumerate(chunks, 1):
-            # Add context about which part this is
-            chunk_context = f"Part {i} of {len(chunks)}:\n\n{chunk}"
-            messages = prompt.format_messages(text=chunk_context)
-            response = await summarizer.ainvoke(messages)
-            summaries.append(response.content)
-        
-        # Combine chunk summaries with clear section markers
-        combined_summary = "\n\n=== Section Break ===\n\n".join(summaries)
-        
-        # If combined summary is still too long, recursively summarize
-        if count_tokens(combined_summary, target_model) > target_max_tokens:
-            # Add context about this being a meta-summary
-            meta_context = (
-                "This is a meta-summary combining multiple detailed section summaries. "
-                "Each section represents a distinct part of the original content.\n\n"
-                f"{combined_summary}"
-            )
-            return await summarize_long_text(meta_context, target_model, summarizer_model)
-        
-        return combined_summary
-    
+
+    async def summarize(chunk: str) -> str:
+        # Chunk sizes are known from the splitter; avoid tokenizing every input again
+        with span("summarize_chunk", "summarize", input_chars=len(chunk)) as chunk_span:
+            chunk_key = make_key("chunk", SUMMARIZE_PROMPT_VERSION, summarizer_model, chunk)
+            if cache is not None:
+                cached = await cache.aget(chunk_key)
+                if cached is not None:
+                    chunk_span.set(cached=True)
+                    return cached.decode("utf-8")
+            response = await summarizer.ainvoke(prompt.format_messages(text=chunk))
+            if cache is not None:
+                await cache.aset(chunk_key, response.content.encode("utf-8"))
+            chunk_span.set(cached=False, output_tokens=count_tokens(response.content, summarizer_model))
+            return response.content
+
     # Text fits in summarizer's context window, summarize directly
-    messages = prompt.format_messages(text=text)
-    response = await summarizer.ainvoke(messages)
-    return response.content
+    if count_tokens(text, summarizer_model) <= summarizer_config["context_window"]:
+        return await summarize(text)
+
+    # Map: summarize every chunk concurrently
+    chunks = split_text_into_chunks(text, summarizer_model)
+    progress = {"completed": 0, "total": len(chunks), "stage": "map"}
+
+    async def advance() -> None:
+        progress["completed"] += 1
+        await _report(on_progress, progress["stage"], progress["completed"], progress["total"])
+
+    map_inputs = [f"Part {i} of {len(chunks)}:\n\n{chunk.text}" for i, chunk in enumerate(chunks, 1)]
+    logger.info(f"Summarizing {len(chunks)} chunks of {[chunk.token_count for chunk in chunks]} tokens")
+    summaries = await _summarize_all(summarize, map_inputs, max_concurrency, max_retries, advance)
+
+    # Reduce: plan the tree up front, then run each level's groups concurrently
+    group_budget = (summarizer_config["context_window"] - summarizer_config["max_output_tokens"]
+                    - count_tokens(SUMMARIZE_PROMPT + META_SUMMARY_CONTEXT, summarizer_model))
+    summary_tokens = count_tokens_batch(summaries, target_model)
+    # Groups are sized in the summarizer's tokens; the target budget is converted to them
+    # so the plan groups exactly like the first reduce level below
+    group_sizes = count_tokens_batch(summaries, summarizer_model)
+    ratio = sum(group_sizes) / max(sum(summary_tokens), 1)
+    plan = plan_reduce_tree(group_sizes, group_budget, int(target_max_tokens * ratio),
+                            summarizer_config["max_output_tokens"])
+    progress.update(stage="reduce", total=progress["total"] + sum(len(level) for level in plan))
+
+    for level in range(MAX_REDUCE_LEVELS):
+        if _joined_tokens(summary_tokens) <= target_max_tokens:
+            break
+        if level > 0:
+            group_sizes = count_tokens_batch(summaries, summarizer_model)
+        # Group by the actual sizes; the first level uses the same counts as the plan
+        groups = _group_by_budget(group_sizes, group_budget)
+        planned = len(plan[level]) if level < len(plan) else 0
+        progress["total"] += len(groups) - planned
+        reduce_inputs = [META_SUMMARY_CONTEXT + SECTION_BREAK.join(summaries[i] for i in group)
+                         for group in groups]
+        summaries = await _summarize_all(summarize, reduce_inputs, max_concurrency, max_retries, advance)
+        summary_tokens = count_tokens_batch(summaries, target_model)
+
+    # Combine summaries with clear section markers
+    return SECTION_BREAK.join(summaries)
@@ -1,7 +1,23 @@
-from typing import List, Dict
-import tiktoken
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from anthropic import Anthropic
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from typing import TYPE_CHECKING, List, Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Claude's tokenizer is not public; it produces roughly this many tokens per cl100k token
+CLAUDE_TOKEN_RATIO = 1.1
+# Last-resort estimate when no tiktoken encoding is available
+CHARS_PER_TOKEN = 4
 
 # Model configurations for context windows and max output tokens
 MODEL_CONFIGS = {
@@ -21,65 +37,284 @@ def get_model_config(model_name: str) -> Dict[str, int]:
                              {"context_window": 128000, "max_output_tokens": 16384})  # Default to gpt-4o settings
 
 
-def count_tokens(text: str, model_name: str = "gpt-4o") -> int:
-    """Count the number of tokens in a text string."""
-    if "claude" in model_name.lower():
-        client = Anthropic()
-        response = client.messages.count_tokens(
+class TokenCounter:
+    """Token counting engine shared by the whole app.
+
+    Encoders are loaded once per encoding and reused, and every count is memoized in
+    an LRU keyed by (content hash, model). Claude models are counted locally by
+    default using an approximation over the cl100k encoding; set
+    `CLAUDE_TOKEN_COUNT_MODE=api` to use Anthropic's exact (networked) count instead.
+    When no tiktoken encoding can be loaded at all (e.g. offline without a tiktoken
+    cache), counts fall back to a characters-per-token estimate.
+    """
+
+    def __init__(self, max_entries: int = 50000, claude_mode: Optional[str] = None):
+        self.max_entries = max_entries
+        self.claude_mode = claude_mode or os.getenv("CLAUDE_TOKEN_COUNT_MODE", "local")
+        self._encodings: Dict[str, Optional["tiktoken.Encoding"]] = {}
+        self._memo: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._anthropic = None
+        self.hits = 0
+        self.misses = 0
+
+    def preload(self, model_names: Iterable[str] = ("gpt-4o", "gpt-4", "claude")) -> None:
+        """Load encoders ahead of the first request, e.g. at app startup."""
+        for model_name in model_names:
+            self.get_encoding(model_name)
+
+    def get_encoding(self, model_name: str) -> Optional["tiktoken.Encoding"]:
+        """Return the cached tiktoken encoding used for a model, or None if unavailable."""
+        encoding_name = self._encoding_name(model_name)
+        if encoding_name not in self._encodings:
+            import tiktoken
+            try:
+                self._encodings[encoding_name] = tiktoken.get_encoding(encoding_name)
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding {encoding_name}: {str(e)}")
+                self._encodings[encoding_name] = None
+        return self._encodings[encoding_name]
+
+    def count(self, text: str, model_name: str = "gpt-4o") -> int:
+        """Count the number of tokens in a text string."""
+        return self.count_batch([text], model_name)[0]
+
+    def count_batch(self, texts: Sequence[str], model_name: str = "gpt-4o") -> List[int]:
+        """Count tokens for many strings at once.
+
+        Memoized strings are answered from the LRU; the rest are encoded together in
+        a single batch call.
+        """
+        keys = [(_content_hash(text), model_name) for text in texts]
+        counts: List[Optional[int]] = [None] * len(texts)
+        missing: List[int] = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                count = self._memo.get(key)
+                if count is None:
+                    missing.append(i)
+                else:
+                    self._memo.move_to_end(key)
+                    counts[i] = count
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            computed = self._count_uncached([texts[i] for i in missing], model_name)
+            with self._lock:
+                for i, count in zip(missing, computed):
+                    counts[i] = count
+                    self._memo[keys[i]] = count
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+
+        return counts
+
+    def truncate(self, text: str, max_tokens: int, model_name: str = "gpt-4o") -> str:
+        """Return the longest prefix of `text` that fits in `max_tokens` tokens."""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text, model_name) <= max_tokens:
+            return text
+        limit = max_tokens
+        if "claude" in model_name.lower():
+            limit = int(max_tokens / CLAUDE_TOKEN_RATIO)
+        encoding = self.get_encoding(model_name)
+        if encoding is None:
+            return text[:limit * CHARS_PER_TOKEN]
+        return encoding.decode(encoding.encode_ordinary(text)[:limit])
+
+    def stats(self) -> Dict[str, float]:
+        """Return memo hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._memo),
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _count_uncached(self, texts: List[str], model_name: str) -> List[int]:
+        is_claude = "claude" in model_name.lower()
+        if is_claude and self.claude_mode == "api":
+            return [self._count_with_anthropic(text, model_name) for text in texts]
+
+        encoding = self.get_encoding(model_name)
+        if encoding is None:
+            counts = [math.ceil(len(text) / CHARS_PER_TOKEN) for text in texts]
+        else:
+            counts = [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+        if is_claude:
+            counts = [math.ceil(count * CLAUDE_TOKEN_RATIO) for count in counts]
+        return counts
+
+    def _count_with_anthropic(self, text: str, model_name: str) -> int:
+        if self._anthropic is None:
+            from anthropic import Anthropic
+            self._anthropic = Anthropic()
+        response = self._anthropic.messages.count_tokens(
             model=model_name,
             messages=[{"role": "user", "content": text}]
         )
         return response.input_tokens
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
 
+    @staticmethod
+    def _encoding_name(model_name: str) -> str:
+        if "claude" in model_name.lower():
+            return "cl100k_base"
+        import tiktoken
+        try:
+            return tiktoken.encoding_name_for_model(model_name)
+        except KeyError:
+            return "cl100k_base"
 
-def split_text_by_tokens(text: str, model_name: str, chunk_overlap: int = 100) -> List[str]:
-    """Split text into chunks that fit within the model's context window."""
-    model_config = get_model_config(model_name)
-    max_tokens = model_config["context_window"]
 
-    # Calculate chunk size to leave room for model response
-    chunk_size = max_tokens - model_config["max_output_tokens"]
+def _content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
 
-    # Use RecursiveCharacterTextSplitter with appropriate tokenizer
-    if "claude" in model_name.lower():
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=lambda x: count_tokens(x, model_name)
-        )
+
+token_counter = TokenCounter()
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o") -> int:
+    """Count the number of tokens in a text string."""
+    return token_counter.count(text, model_name)
+
+
+def count_tokens_batch(texts: Sequence[str], model_name: str = "gpt-4o") -> List[int]:
+    """Count the number of tokens in each of several strings with a single call."""
+    return token_counter.count_batch(texts, model_name)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = "gpt-4o") -> str:
+    """Cut a text down to at most `max_tokens` tokens, keeping its beginning."""
+    return token_counter.truncate(text, max_tokens, model_name)
+
+
+class TextChunk(NamedTuple):
+    text: str
+    start: int  # Character offsets of the chunk in the source text
+    end: int
+    token_count: int
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s)|\n")
+# A chunk is cut at a paragraph or sentence boundary only if it keeps at least this share of its token budget
+MIN_SNAP_FRACTION = 0.5
+
+
+def split_text_into_chunks(text: str, model_name: str, chunk_tokens: Optional[int] = None,
+                           chunk_overlap: int = 100) -> List[TextChunk]:
+    """Split text into chunks of at most `chunk_tokens` tokens.
+
+    The text is tokenized once; chunks are cut on token boundaries, preferably at the
+    end of a paragraph or else a sentence, and consecutive chunks overlap by up to
+    `chunk_overlap` tokens (starting at a sentence boundary where possible). Claude
+    chunks are sized with the local cl100k approximation, never with the count API.
+
+    Args:
+        text: Text to split
+        model_name: Model whose tokenizer sizes the chunks
+        chunk_tokens: Maximum tokens per chunk; defaults to the model's context window
+            minus its maximum output tokens
+        chunk_overlap: Tokens repeated from the end of one chunk at the start of the next
+
+    Returns:
+        Chunks with their text, character offsets in `text` and token counts
+    """
+    if chunk_tokens is None:
+        model_config = get_model_config(model_name)
+        chunk_tokens = model_config["context_window"] - model_config["max_output_tokens"]
+    ratio = CLAUDE_TOKEN_RATIO if "claude" in model_name.lower() else 1.0
+    limit = max(1, int(chunk_tokens / ratio))
+    overlap = min(int(chunk_overlap / ratio), limit // 2)
+
+    # offsets[i] is the character offset where token i starts
+    encoding = token_counter.get_encoding(model_name)
+    if encoding is None:
+        offsets = list(range(0, len(text), CHARS_PER_TOKEN))
     else:
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            model_name="gpt-4",  # Using gpt-4 encoding as base
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=lambda x: count_tokens(x, model_name)
-        )
+        _, offsets = encoding.decode_with_offsets(encoding.encode_ordinary(text))
+    token_total = len(offsets)
+    if token_total == 0:
+        return []
+    offsets.append(len(text))
+
+    # Token indices where a paragraph or sentence ends (the next token starts after it)
+    paragraph_ends = _boundary_tokens(offsets, (m.start() for m in _PARAGRAPH_BREAK.finditer(text)))
+    sentence_ends = _boundary_tokens(offsets, (m.end() for m in _SENTENCE_END.finditer(text)))
+
+    chunks: List[TextChunk] = []
+    start = 0
+    while True:
+        end = min(start + limit, token_total)
+        if end < token_total:
+            earliest = start + int(limit * MIN_SNAP_FRACTION)
+            end = (_last_boundary(paragraph_ends, earliest, end)
+                   or _last_boundary(sentence_ends, earliest, end)
+                   or end)
+        count = end - start
+        chunks.append(TextChunk(text[offsets[start]:offsets[end]], offsets[start], offsets[end],
+                                math.ceil(count * ratio) if ratio != 1.0 else count))
+        if end >= token_total:
+            return chunks
+        next_start = max(end - overlap, start + 1)
+        # Begin the overlap at the first sentence that starts within it
+        i = bisect_left(sentence_ends, next_start)
+        if i < len(sentence_ends) and sentence_ends[i] < end:
+            next_start = sentence_ends[i]
+        start = next_start
+
+
+def _boundary_tokens(offsets: List[int], positions: Iterable[int]) -> List[int]:
+    """Map character positions to the sorted, distinct indices of the first token starting at or after them."""
+    tokens = []
+    for position in positions:
+        token = bisect_left(offsets, position)
+        if 0 < token < len(offsets) - 1 and (not tokens or tokens[-1] != token):
+            tokens.append(token)
+    return tokens
 
-    return text_splitter.split_text(text)
+
+def _last_boundary(boundaries: List[int], earliest: int, latest: int) -> Optional[int]:
+    """Return the last boundary in [earliest, latest], if any."""
+    i = bisect_right(boundaries, latest) - 1
+    if i >= 0 and boundaries[i] >= earliest:
+        return boundaries[i]
+    return None
+
+
+def split_text_by_tokens(text: str, model_name: str, chunk_overlap: int = 100) -> List[str]:
+    """Split text into chunks that fit within the model's context window."""
+    return [chunk.text for chunk in split_text_into_chunks(text, model_name, chunk_overlap=chunk_overlap)]
 
 
 def ensure_context_length(messages: List[dict], model_name: str) -> List[dict]:
-    """Ensure that the total context length fits within model limits."""
+    """Ensure that the total context length fits within model limits.
+
+    Returns the most recent messages whose combined token count fits the model's
+    context window, always keeping at least the last message.
+    """
     model_config = get_model_config(model_name)
     max_tokens = model_config["context_window"]
 
-    # Count total tokens in messages
-    total_tokens = 0
-    for message in messages:
-        total_tokens += count_tokens(message["content"], model_name)
+    # Count all messages in a single batch and build running prefix sums
+    message_tokens = count_tokens_batch([message["content"] for message in messages], model_name)
+    prefix = [0] + list(accumulate(message_tokens))
+    total_tokens = prefix[-1]
 
     # If within limits, return original messages
     if total_tokens <= max_tokens:
         return messages
 
-    # If over limit, remove oldest messages until under limit
-    while total_tokens > max_tokens and len(messages) > 1:
-        removed_message = messages.pop(0)
-        total_tokens -= count_tokens(removed_message["content"], model_name)
-
-    return messages
+    # Binary search for the oldest message that can be kept
+    start = min(bisect_left(prefix, total_tokens - max_tokens), len(messages) - 1)
+    return messages[start:]
@@ -0,0 +1,104 @@
+import struct
+from array import array
+from typing import Dict, Iterable, List
+
+# Serialized layout: magic, block count, text length in bytes, then starts, durations, offsets and UTF-8 text
+_MAGIC = b"CT1\0"
+_HEADER = struct.Struct("<4sII")
+
+
+class CompactTranscript:
+    """A transcript stored as packed arrays instead of one dict per caption.
+
+    Start times and durations are `array('d')`, and the caption texts live in one
+    string joined with spaces, with `offsets[i]` marking where caption i starts. The
+    plain-text rendering is the joined buffer itself, and timestamped rendering
+    formats all blocks in one pass.
+    """
+    __slots__ = ("starts", "durations", "text", "offsets")
+
+    def __init__(self, starts: array, durations: array, text: str, offsets: array):
+        self.starts = starts
+        self.durations = durations
+        self.text = text
+        # len(offsets) == len(starts) + 1; offsets[-1] is len(text) + 1 (one past the final separator)
+        self.offsets = offsets
+
+    @classmethod
+    def from_blocks(cls, blocks: Iterable[Dict]) -> "CompactTranscript":
+        """Build from the caption dicts returned by YouTubeTranscriptApi ({'text', 'start', 'duration'})."""
+        starts, durations, offsets = array('d'), array('d'), array('q', [0])
+        texts: List[str] = []
+        position = 0
+        for block in blocks:
+            starts.append(block['start'])
+            durations.append(block['duration'])
+            texts.append(block['text'])
+            position += len(block['text']) + 1
+            offsets.append(position)
+        return cls(starts, durations, " ".join(texts), offsets)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def block_text(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def to_blocks(self) -> List[Dict]:
+        """Return the caption dicts this transcript was built from."""
+        return [
+            {"text": self.block_text(i), "start": self.starts[i], "duration": self.durations[i]}
+            for i in range(len(self))
+        ]
+
+    def format(self, include_timestamps: bool = False) -> str:
+        """Render as plain text, or one "HH:MM:SS.mmm - HH:MM:SS.mmm: text" line per caption."""
+        if not include_timestamps:
+            return self.text
+        text, offsets = self.text, self.offsets
+        # Consecutive captions usually end where the next one starts, so most stamps repeat
+        stamps: Dict[float, str] = {}
+        lines = []
+        for i, (start, duration) in enumerate(zip(self.starts, self.durations)):
+            end = start + duration
+            start_stamp = stamps.get(start)
+            if start_stamp is None:
+                start_stamp = stamps[start] = _timestamp(start)
+            end_stamp = stamps.get(end)
+            if end_stamp is None:
+                end_stamp = stamps[end] = _timestamp(end)
+            lines.append(f"{start_stamp} - {end_stamp}: {text[offsets[i]:offsets[i + 1] - 1]}")
+        return "\n".join(lines)
+
+    def to_bytes(self) -> bytes:
+        encoded = self.text.encode("utf-8", "surrogatepass")
+        return b"".join((
+            _HEADER.pack(_MAGIC, len(self), len(encoded)),
+            self.starts.tobytes(),
+            self.durations.tobytes(),
+            self.offsets.tobytes(),
+            encoded,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactTranscript":
+        magic, count, text_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized CompactTranscript")
+        position = _HEADER.size
+        starts, durations, offsets = array('d'), array('d'), array('q')
+        for values, length in ((starts, count), (durations, count), (offsets, count + 1)):
+            size = length * values.itemsize
+            values.frombytes(data[position:position + size])
+            position += size
+        text = data[position:position + text_size].decode("utf-8", "surrogatepass")
+        return cls(starts, durations, text, offsets)
+
+    @staticmethod
+    def is_serialized(data: bytes) -> bool:
+        return data[:len(_MAGIC)] == _MAGIC
+
+
+def _timestamp(seconds: float) -> str:
+    # Same output as time_format.format_seconds_to_timestamp, inlined for the bulk path
+    return f"{int(seconds // 3600):02d}:{int((seconds % 3600) // 60):02d}:{seconds % 60:06.3f}"
@@ -1,65 +1,196 @@
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api.formatters import TextFormatter
 import asyncio
-from functools import lru_cache
-from typing import List, Dict, Optional
+import json
+import os
+import time
+from typing import AsyncIterator, List, Dict, Optional, Tuple, Union
 
-from services.youtube.time_format import format_seconds_to_timestamp
+from services.tracing import activate, current_span, span, tracer
+from services.utils.disk_cache import CACHE_DIR, DiskCache
+from services.utils.executors import POOL_SIZES, get_executor
+from services.youtube.compact_transcript import CompactTranscript
 from services.youtube.url_parser import get_video_id
 
 
-@lru_cache(maxsize=100)
-def _get_cached_transcript(video_id: str) -> Optional[List[Dict]]:
+# Transcripts rarely change once published; failures are retried after a short TTL
+TRANSCRIPT_TTL_SECONDS = 30 * 24 * 3600
+FAILURE_TTL_SECONDS = 10 * 60
+TRANSCRIPT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Videos fetched at once, seconds one video may take, and seconds a whole batch may take
+TRANSCRIPT_CONCURRENCY = POOL_SIZES["transcripts"]
+VIDEO_TIMEOUT_SECONDS = 30
+TRANSCRIPTS_DEADLINE_SECONDS = 90
+
+# Compressed transcript store shared by all sessions and worker processes
+transcript_cache = DiskCache(os.path.join(CACHE_DIR, "transcripts.sqlite3"), TRANSCRIPT_CACHE_MAX_BYTES,
+                             compress=True)
+
+# Marker stored for videos whose transcript could not be retrieved
+_MISSING = b"null"
+_negative_hits = 0
+
+
+def _get_cached_transcript(video_id: str) -> Optional[CompactTranscript]:
     """
-    Retrieve and cache transcript for a given video ID.
-    Returns None if transcript is not available.
+    Retrieve transcript for a given video ID, using the persistent transcript cache.
+    Returns None if transcript is not available. Failures are cached only for
+    FAILURE_TTL_SECONDS so that transient errors do not stick.
     """
+    global _negative_hits
+    cached = transcript_cache.get(video_id)
+    if cached is not None:
+        if cached == _MISSING:
+            _negative_hits += 1
+            return None
+        if CompactTranscript.is_serialized(cached):
+            return CompactTranscript.from_bytes(cached)
+        # Entry written before transcripts were stored compactly
+        return CompactTranscript.from_blocks(json.loads(cached))
+
     try:
-        return YouTubeTranscriptApi.get_transcript(video_id)
+        transcript = CompactTranscript.from_blocks(YouTubeTranscriptApi.get_transcript(video_id))
     except Exception:
+        transcript_cache.set(video_id, _MISSING, ttl=FAILURE_TTL_SECONDS)
         return None
+    transcript_cache.set(video_id, transcript.to_bytes(), ttl=TRANSCRIPT_TTL_SECONDS)
+    return transcript
+
 
+def transcript_cache_stats() -> Dict[str, float]:
+    """Return transcript cache hit rate, stored size and bytes served from cache."""
+    stats = transcript_cache.stats()
+    stats["negative_hits"] = _negative_hits
+    return stats
 
-def _format_transcript(transcript: List[Dict], include_timestamps: bool = False) -> str:
+
+def _format_transcript(transcript: Union[CompactTranscript, List[Dict]], include_timestamps: bool = False) -> str:
     """
     Format transcript, optionally including timestamps.
     
     Args:
-        transcript: List of transcript blocks
+        transcript: Compact transcript, or a list of transcript blocks
         include_timestamps: Whether to include timestamps in output
         
     Returns:
         Formatted transcript text
     """
-    if include_timestamps:
-        lines = []
-        for block in transcript:
-            start = block['start']
-            duration = block['duration']
-            end = start + duration
-            text = block['text']
-            lines.append(f"{format_seconds_to_timestamp(start)} - {format_seconds_to_timestamp(end)}: {text}")
-        return "\n".join(lines)
-    else:
-        # Just concatenate the text for more concise output
-        return " ".join(block['text'] for block in transcript)
-
-
-async def _get_transcript_async(video_id: str, include_timestamps: bool = False) -> Optional[str]:
+    if not isinstance(transcript, CompactTranscript):
+        transcript = CompactTranscript.from_blocks(transcript)
+    # Without timestamps this is the joined caption text, for more concise output
+    return transcript.format(include_timestamps)
+
+
+async def _get_transcript_async(video_id: str, include_timestamps: bool = False, timeout: Optional[float] = None,
+                                workers: Optional[List[asyncio.Future]] = None) -> Optional[str]:
     """
     Asynchronously retrieve and format transcript for a video.
+
+    The fetch and formatting run as one call on the bounded transcripts pool. A worker
+    thread cannot be interrupted, so `timeout` counts from when the call starts running
+    (not while it waits for a free thread), and the call's future is appended to
+    `workers` so the caller can tell when the thread is actually free again.
     """
-    # Run the blocking API call in a thread pool
-    transcript = await asyncio.get_event_loop().run_in_executor(
-        None, _get_cached_transcript, video_id
-    )
+    loop = asyncio.get_running_loop()
+    started = asyncio.Event()
+
+    def load() -> Optional[str]:
+        try:
+            loop.call_soon_threadsafe(started.set)
+        except RuntimeError:
+            # The loop has closed and nobody is waiting; still fetch so the result is cached
+            pass
+        transcript = _get_cached_transcript(video_id)
+        return _format_transcript(transcript, include_timestamps) if transcript else None
+
+    worker = loop.run_in_executor(get_executor("transcripts"), load)
+    if workers is not None:
+        workers.append(worker)
+    await started.wait()
+    # Shielded: giving up on the result must not detach the worker from its caller
+    return await asyncio.wait_for(asyncio.shield(worker), timeout)
+
+
+async def _fetch_transcript(url: str, include_timestamps: bool, video_timeout: float,
+                            workers: Optional[List[asyncio.Future]] = None) -> str:
+    """Fetch and format one transcript, returning an error message instead of raising."""
+    try:
+        # First validate URL and get video ID
+        video_id = get_video_id(url)
+        if not video_id:
+            return f"Error: Invalid YouTube URL format: {url}"
+
+        # Get transcript
+        with span("transcript", "transcripts", video_id=video_id) as video_span:
+            transcript = await _get_transcript_async(video_id, include_timestamps, video_timeout, workers)
+            video_span.set(chars=len(transcript) if transcript else 0)
+        if not transcript:
+            return f"Error: Could not get transcript for video {url}. The video might not have captions available."
+
+        return transcript
+
+    except asyncio.TimeoutError:
+        return f"Error: Timed out after {video_timeout}s getting the transcript for video {url}"
+    except Exception as e:
+        return f"Error: {str(e)} for video {url}"
+
+
+async def iter_transcripts(video_urls: List[str], include_timestamps: bool = False,
+                           max_concurrency: int = TRANSCRIPT_CONCURRENCY,
+                           video_timeout: float = VIDEO_TIMEOUT_SECONDS,
+                           deadline: float = TRANSCRIPTS_DEADLINE_SECONDS) -> AsyncIterator[Tuple[int, str, str]]:
+    """
+    Retrieve transcripts for multiple videos, yielding each one as soon as it is ready.
     
-    if transcript:
-        # Format the transcript in the thread pool as well
-        return await asyncio.get_event_loop().run_in_executor(
-            None, lambda: _format_transcript(transcript, include_timestamps)
-        )
-    return None
+    Args:
+        video_urls: List of YouTube video URLs
+        include_timestamps: Whether to include timestamps in output
+        max_concurrency: Maximum number of videos fetched at once
+        video_timeout: Seconds a single video may take once its fetch has started
+        deadline: Seconds the whole batch may take; videos still pending then are
+            yielded as errors
+        
+    Yields:
+        (index in video_urls, url, formatted transcript or error message), in completion order
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch(index: int, url: str) -> Tuple[int, str, str]:
+        await semaphore.acquire()
+        workers: List[asyncio.Future] = []
+        try:
+            return index, url, await _fetch_transcript(url, include_timestamps, video_timeout, workers)
+        finally:
+            # A timed out or cancelled fetch keeps its slot until the worker thread is done,
+            # so abandoned calls never make later videos queue for a busy pool
+            if workers and not workers[0].done():
+                workers[0].add_done_callback(lambda _: semaphore.release())
+            else:
+                semaphore.release()
+
+    batch_span = tracer.start("get_transcripts", "transcripts", current_span(), videos=len(video_urls))
+    with activate(batch_span):
+        tasks = {asyncio.ensure_future(fetch(i, url)): (i, url) for i, url in enumerate(video_urls)}
+    pending = set(tasks)
+    finish_by = time.monotonic() + deadline
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(finish_by - time.monotonic(), 0),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+            if not done:
+                # Overall deadline passed
+                for task in sorted(pending, key=lambda task: tasks[task][0]):
+                    index, url = tasks[task]
+                    yield index, url, f"Error: The transcript for video {url} was not ready within {deadline}s"
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        batch_span.set(timed_out=len(pending))
+        tracer.finish(batch_span)
 
 
 async def get_transcripts_async(video_urls: List[str], include_timestamps: bool = False) -> List[str]:
@@ -71,28 +202,12 @@ async def get_transcripts_async(video_urls: List[str], include_timestamps: bool
         include_timestamps: Whether to include timestamps in output
         
     Returns:
-        List of formatted transcripts or error messages
+        List of formatted transcripts or error messages, in the order of video_urls
     """
-    async def process_url(url: str) -> str:
-        try:
-            # First validate URL and get video ID
-            video_id = get_video_id(url)
-            if not video_id:
-                return f"Error: Invalid YouTube URL format: {url}"
-                
-            # Get transcript
-            transcript = await _get_transcript_async(video_id, include_timestamps)
-            if not transcript:
-                return f"Error: Could not get transcript for video {url}. The video might not have captions available."
-                
-            return transcript
-            
-        except Exception as e:
-            return f"Error: {str(e)} for video {url}"
-
-    # Process all URLs concurrently
-    tasks = [process_url(url) for url in video_urls]
-    return await asyncio.gather(*tasks)
+    transcripts = [""] * len(video_urls)
+    async for index, _, transcript in iter_transcripts(video_urls, include_timestamps):
+        transcripts[index] = transcript
+    return transcripts
 
 
 def get_transcripts(video_urls: List[str], include_timestamps: bool = False) -> List[str]: